@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from Instrumentacion import registro
+
+
+class AlmacenCaracteristicas:
+    def __init__(self, ruta):
+        """
+        Almacén binario de características: una matriz float32 en `<ruta>.npy` (memory-mapped al leer)
+        y un archivo `<ruta>.json` con los metadatos: nombres de columnas, archivos, etiquetas,
+        media/escala del escalador, versión del extractor y un hash del contenido.
+        :param ruta: Ruta base del almacén, sin extensión.
+        """
+        self.ruta = ruta
+        self.ruta_matriz = f"{ruta}.npy"
+        self.ruta_metadatos = f"{ruta}.json"
+        self.X = None
+        self.metadatos = None
+
+    @property
+    def existe(self):
+        return os.path.exists(self.ruta_matriz) and os.path.exists(self.ruta_metadatos)
+
+    @property
+    def columnas(self):
+        return self.metadatos["columnas"]
+
+    @property
+    def archivos(self):
+        return np.array(self.metadatos["archivos"])
+
+    @property
+    def etiquetas(self):
+        if self.metadatos["etiquetas"] is None:
+            return None
+        return np.array(self.metadatos["etiquetas"])
+
+    @property
+    def hash(self):
+        return self.metadatos["hash"]
+
+    @staticmethod
+    def _calcular_hash(X, columnas):
+        sha1 = hashlib.sha1()
+        sha1.update(json.dumps(columnas).encode("utf-8"))
+        sha1.update(np.ascontiguousarray(X).tobytes())
+        return sha1.hexdigest()
+
+    def guardar(self, X, columnas, archivos, etiquetas=None, scaler=None, extractor=None):
+        """
+        Guarda la matriz de características y sus metadatos.
+        :param X: Matriz (N, d) de características (se guarda como float32).
+        :param columnas: Nombres de las d columnas.
+        :param archivos: Nombre de archivo de cada fila.
+        :param etiquetas: Etiqueta de cada fila (None para candidatos sin etiqueta).
+        :param scaler: `StandardScaler` ajustado con el que se escalaron los datos (opcional).
+        :param extractor: `ExtractorCaracteristicas` con el que se calcularon (opcional).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        columnas = list(columnas)
+        self.metadatos = {
+            "columnas": columnas,
+            "archivos": [str(archivo) for archivo in archivos],
+            "etiquetas": None if etiquetas is None else [str(etiqueta) for etiqueta in etiquetas],
+            "media": None if scaler is None else scaler.mean_.tolist(),
+            "escala": None if scaler is None else scaler.scale_.tolist(),
+            "version_extractor": None if extractor is None else extractor.VERSION,
+            "firma_extractor": None if extractor is None else extractor.firma,
+            "hash": self._calcular_hash(X, columnas),
+        }
+        # Se escribe a archivos temporales y se reemplaza de forma atómica: los lectores que tengan la matriz
+        # mapeada en memoria conservan el archivo anterior en lugar de ver uno a medio escribir
+        ruta_temporal = f"{self.ruta}.tmp.npy"
+        np.save(ruta_temporal, X)
+        os.replace(ruta_temporal, self.ruta_matriz)
+        with open(f"{self.ruta_metadatos}.tmp", "w", encoding="utf-8") as archivo:
+            json.dump(self.metadatos, archivo, ensure_ascii=False)
+        os.replace(f"{self.ruta_metadatos}.tmp", self.ruta_metadatos)
+        self.X = X
+        return self
+
+    def cargar(self, mmap=True):
+        """
+        Carga el almacén. Con mmap=True la matriz se mapea en memoria en modo lectura (sin copias).
+        Si el almacén no existe pero sí el CSV de siempre (`<ruta>.csv`), primero se migra con `importar_csv`.
+        """
+        if not self.existe and os.path.exists(f"{self.ruta}.csv"):
+            registro.info(f"Migrando {self.ruta}.csv al almacén binario de características...")
+            self.importar_csv(f"{self.ruta}.csv")
+        if not self.existe:
+            raise FileNotFoundError(f"El almacén de características {self.ruta} no existe. Procesa primero los audios.")
+        with open(self.ruta_metadatos, encoding="utf-8") as archivo:
+            self.metadatos = json.load(archivo)
+        self.X = np.load(self.ruta_matriz, mmap_mode="r" if mmap else None)
+        return self
+
+    def a_dataframe(self):
+        """
+        Devuelve el contenido como DataFrame con el mismo esquema que los CSV (columnas, "Archivo", "Etiqueta").
+        """
+        df = pd.DataFrame(np.asarray(self.X), columns=self.columnas)
+        df["Archivo"] = self.archivos
+        if self.metadatos["etiquetas"] is not None:
+            df["Etiqueta"] = self.etiquetas
+        return df
+
+    def importar_csv(self, csv_path):
+        """
+        Crea el almacén a partir de un CSV con el esquema clásico (para migrar datos existentes).
+        Los CSV no guardan el escalador ni la versión del extractor, por lo que esos metadatos quedan vacíos.
+        """
+        df = pd.read_csv(csv_path)
+        etiquetas = df["Etiqueta"].values if "Etiqueta" in df.columns else None
+        caracteristicas = df.drop(columns=["Archivo", "Etiqueta"], errors="ignore")
+        return self.guardar(caracteristicas.values, caracteristicas.columns, df["Archivo"].values, etiquetas)
+
+    def exportar_csv(self, output_path):
+        """
+        Exporta el almacén a CSV con el esquema clásico de `Parametros/`.
+        """
+        self.a_dataframe().to_csv(output_path, index=False)
+        registro.info(f"Características exportadas en {output_path}")
@@ -1,17 +1,19 @@
+import os
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.feature_selection import SelectKBest, f_classif
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from SelectorParametros import SelectorParametros
 
 
 class AnalizadorParametros:
-    def __init__(self, base_datos_csv):
+    def __init__(self, base_datos_path):
         """
         Clase para analizar la relevancia de los parámetros de los datos de audio.
-        :param base_datos_csv: Ruta al archivo CSV con la base de datos aumentada.
+        :param base_datos_path: Ruta (sin extensión) al almacén de la base de datos aumentada.
         """
-        self.base_datos_csv = base_datos_csv
+        self.base_datos_path = base_datos_path
         self.base_datos = None
         self.X = None
         self.y = None
@@ -20,7 +22,7 @@ class AnalizadorParametros:
         """
         Carga la base de datos y separa las características y las etiquetas.
         """
-        self.base_datos = pd.read_csv(self.base_datos_csv)
+        self.base_datos = AlmacenCaracteristicas(self.base_datos_path).cargar().a_dataframe()
         self.X = self.base_datos.drop(columns=["Archivo", "Etiqueta"])
         self.y = self.base_datos["Etiqueta"]
 
@@ -83,10 +85,9 @@ class AnalizadorParametros:
         :param k: Número de parámetros a seleccionar.
         """
         print(f"Seleccionando los {k} mejores parámetros utilizando ANOVA F-value...")
-        selector = SelectKBest(score_func=f_classif, k=k)
-        selector.fit(self.X, self.y)
+        selector = SelectorParametros("anova", k=k).ajustar(self.X.to_numpy(), self.y, list(self.X.columns))
 
-        seleccionados = self.X.columns[selector.get_support()]
+        seleccionados = pd.Index(selector.columnas_seleccionadas)
         print(f"\nLos {k} mejores parámetros seleccionados son:")
         for parametro in seleccionados:
             print(f"- {parametro}")
@@ -96,8 +97,9 @@ class AnalizadorParametros:
 
 # Punto de entrada para analizar los parámetros
 if __name__ == "__main__":
-    base_datos_csv = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\base_datos_aumentada_parametros.csv"
-    analizador = AnalizadorParametros(base_datos_csv)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    base_datos_path = os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros")
+    analizador = AnalizadorParametros(base_datos_path)
     analizador.cargar_datos()
 
     # Matriz de correlación entre parámetros
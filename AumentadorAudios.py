@@ -0,0 +1,80 @@
+import librosa
+import numpy as np
+from DecodificadorAudios import DecodificadorAudios
+
+
+class AumentadorAudios:
+    # Misma augmentación que se aplicaba con librosa.effects: dos tonos abajo y arriba, ruido blanco
+    # y velocidad 0.9 / 1.1 (el orden define el número de cada archivo aumentado)
+    AUMENTACIONES_POR_DEFECTO = [
+        {"tipo": "tono", "pasos": -2},
+        {"tipo": "tono", "pasos": 2},
+        {"tipo": "ruido", "sigma": 0.01},
+        {"tipo": "velocidad", "factor": 0.9},
+        {"tipo": "velocidad", "factor": 1.1},
+    ]
+
+    def __init__(self, aumentaciones=None, n_fft=2048, hop_length=512):
+        """
+        Motor de augmentación que calcula una única STFT por audio y obtiene de ella todas las variantes
+        de tono y velocidad (un phase vocoder y una iSTFT por variante), en lugar de una STFT por llamada
+        a `librosa.effects.pitch_shift` / `time_stretch`.
+        :param aumentaciones: Lista de diccionarios con la augmentación a aplicar, en orden:
+                              {"tipo": "tono", "pasos": n} (semitonos),
+                              {"tipo": "velocidad", "factor": r},
+                              {"tipo": "ruido", "sigma": s} (desvío absoluto) o {"tipo": "ruido", "snr_db": snr}.
+        :param n_fft: Tamaño de la FFT del phase vocoder (el de librosa por defecto).
+        :param hop_length: Salto entre ventanas del phase vocoder.
+        """
+        self.aumentaciones = [dict(a) for a in (aumentaciones or self.AUMENTACIONES_POR_DEFECTO)]
+        for aumentacion in self.aumentaciones:
+            if aumentacion.get("tipo") not in ("tono", "velocidad", "ruido"):
+                raise ValueError(f"Tipo de augmentación desconocido: {aumentacion}")
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # Remuestreo soxr HQ cacheado por razón (el de `librosa.effects.pitch_shift`)
+        self.decodificador = DecodificadorAudios("alta")
+
+    def _estirar(self, stft, longitud, rate, dtype):
+        """
+        Estiramiento temporal por phase vocoder a partir de una STFT ya calculada
+        (equivalente a `librosa.effects.time_stretch`).
+        """
+        stft_estirada = librosa.phase_vocoder(stft, rate=rate, hop_length=self.hop_length, n_fft=self.n_fft)
+        return librosa.istft(stft_estirada, hop_length=self.hop_length, n_fft=self.n_fft, dtype=dtype,
+                             length=int(round(longitud / rate)))
+
+    def aumentar(self, audio, sr, rng, ajustar_duracion=None):
+        """
+        Aplica todas las augmentaciones configuradas a un audio.
+        :param audio: Señal 1D.
+        :param sr: Frecuencia de muestreo (el cambio de tono se expresa en semitonos, no depende de sr).
+        :param rng: Generador `np.random.Generator` para el ruido.
+        :param ajustar_duracion: Función que se aplica a las variantes de velocidad (p.ej. recortar a 2 s).
+        :return: Lista de audios aumentados, en el orden de `aumentaciones`.
+        """
+        stft = None
+        augmented_audios = []
+        for aumentacion in self.aumentaciones:
+            tipo = aumentacion["tipo"]
+            if tipo == "ruido":
+                if "snr_db" in aumentacion:
+                    sigma = np.sqrt(np.mean(audio ** 2)) / (10.0 ** (aumentacion["snr_db"] / 20.0))
+                else:
+                    sigma = aumentacion["sigma"]
+                augmented_audios.append(audio + rng.normal(0, sigma, len(audio)))
+                continue
+
+            if stft is None:
+                stft = librosa.stft(audio, n_fft=self.n_fft, hop_length=self.hop_length)
+
+            if tipo == "tono":
+                # Estirar por `rate` y remuestrear de sr / rate a sr, recortando al largo original
+                rate = 2.0 ** (-float(aumentacion["pasos"]) / 12.0)
+                estirado = self._estirar(stft, len(audio), rate, audio.dtype)
+                remuestreado = self.decodificador.remuestrear(estirado, float(sr) / rate, sr, dtype=estirado.dtype)
+                augmented_audios.append(librosa.util.fix_length(remuestreado, size=len(audio)))
+            else:
+                estirado = self._estirar(stft, len(audio), aumentacion["factor"], audio.dtype)
+                augmented_audios.append(ajustar_duracion(estirado) if ajustar_duracion else estirado)
+        return augmented_audios
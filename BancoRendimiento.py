@@ -0,0 +1,268 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import numpy as np
+import soundfile as sf
+from ProcesadorAudios import ProcesadorAudios
+from Parametrizador import Parametrizador
+from EvaluadorLOO import EvaluadorLOO
+from ClasificadorAudios import ClasificadorAudios
+from Knn import Knn
+from Instrumentacion import reiniciar_rss_pico, rss_pico_mb
+
+
+
+# Clasificación de un candidato en frío: se ejecuta en un proceso nuevo (argumentos: directorio de trabajo y audio)
+_CANDIDATO_FRIO = """
+import sys
+from ClasificadorAudios import ClasificadorAudios
+from Knn import Knn
+from Parametrizador import Parametrizador
+from ProcesadorAudios import ProcesadorAudios
+
+directorio, ruta = sys.argv[1:3]
+clasificador = ClasificadorAudios(sin_graficos=True)
+clasificador.procesador = ProcesadorAudios(base_path=directorio)
+clasificador.parametrizador = Parametrizador(usar_cache=False, base_path=directorio)
+clasificador.knn = Knn(candidato_csv=None, sin_graficos=True, base_path=directorio)
+clasificador.clasificar_audio(ruta)
+"""
+
+
+class BancoRendimiento:
+    # Etiquetas que reconoce `Parametrizador._obtener_etiqueta` y formantes aproximados (Hz) de cada clase sintética
+    CLASES = {
+        "papa": (700, 1200, 2500),
+        "camote": (400, 900, 2300),
+        "zanahoria": (500, 1700, 2600),
+        "berenjena": (300, 2200, 3000),
+    }
+
+    def __init__(self, directorio, n_por_clase=10, n_clases=4, repeticiones=20, semilla=0):
+        """
+        Banco de pruebas de rendimiento por etapa sobre un corpus sintético determinístico.
+        :param directorio: Carpeta de trabajo (se crean `DB/` y `Parametros/` dentro; no toca los datos reales).
+        :param n_por_clase: Audios sintéticos por clase.
+        :param n_clases: Número de clases (hasta 4, las que reconoce el etiquetado por nombre de archivo).
+        :param repeticiones: Repeticiones de las etapas que se miden sobre un único elemento.
+        :param semilla: Semilla del corpus sintético.
+        """
+        if not 1 <= n_clases <= len(self.CLASES):
+            raise ValueError(f"n_clases debe estar entre 1 y {len(self.CLASES)}.")
+        self.directorio = directorio
+        self.n_por_clase = n_por_clase
+        self.clases = list(self.CLASES)[:n_clases]
+        self.repeticiones = repeticiones
+        self.semilla = semilla
+        self.sr = 16000
+        self.resultados = {}
+
+        self.crudos_path = os.path.join(directorio, "DB", "Crudos")
+        self.processed_path = os.path.join(directorio, "DB", "Processed")
+        self.augmented_path = os.path.join(directorio, "DB", "Augmented")
+        self.parametros_path = os.path.join(directorio, "Parametros")
+        for path in (self.crudos_path, self.processed_path, self.augmented_path, self.parametros_path):
+            os.makedirs(path, exist_ok=True)
+
+    def _senal_sintetica(self, clase, rng, duracion=2.5):
+        """
+        Señal tipo vocal: armónicos de una f0 con envolvente de formantes de la clase, con silencio al inicio
+        y al final y ruido de fondo.
+        """
+        n = int(duracion * self.sr)
+        t = np.arange(n) / self.sr
+        f0 = rng.uniform(100, 220)
+        formantes = np.array(self.CLASES[clase]) * rng.uniform(0.95, 1.05)
+        armonicos = np.arange(1, int(4000 / f0)) * f0
+        amplitudes = np.exp(-0.5 * ((armonicos[:, None] - formantes[None, :]) / 120.0) ** 2).sum(axis=1)
+        fases = rng.uniform(0, 2 * np.pi, len(armonicos))
+        voz = amplitudes @ np.sin(2 * np.pi * armonicos[:, None] * t[None, :] + fases[:, None])
+
+        # Envolvente: silencio, subida, meseta, bajada, silencio
+        inicio, fin = int(rng.uniform(0.1, 0.4) * self.sr), n - int(rng.uniform(0.1, 0.4) * self.sr)
+        envolvente = np.zeros(n)
+        envolvente[inicio:fin] = np.hanning(fin - inicio) ** 0.3
+        senal = voz * envolvente + rng.normal(0, 0.005 * np.max(np.abs(voz)), n)
+        return (senal / np.max(np.abs(senal)) * 0.8).astype(np.float32)
+
+    def generar_corpus(self):
+        """
+        Escribe el corpus sintético en `DB/Crudos` con nombres que siguen la convención de etiquetas ("Papa 3.wav").
+        """
+        rng = np.random.default_rng(self.semilla)
+        for clase in self.clases:
+            for i in range(self.n_por_clase):
+                sf.write(os.path.join(self.crudos_path, f"{clase.capitalize()} {i + 1}.wav"),
+                         self._senal_sintetica(clase, rng), self.sr)
+        return sorted(os.listdir(self.crudos_path))
+
+    def _componentes(self):
+        """
+        Procesador, parametrizador y k-NN apuntando al directorio de trabajo.
+        """
+        procesador = ProcesadorAudios(base_path=self.directorio)
+        parametrizador = Parametrizador(usar_cache=False, base_path=self.directorio)
+
+        knn = Knn(candidato_csv=None, base_path=self.directorio)
+        return procesador, parametrizador, knn
+
+    def _clasificar_en_proceso_nuevo(self, ruta):
+        """
+        Clasifica `ruta` en un intérprete nuevo con los componentes apuntando al directorio de trabajo.
+        """
+        subprocess.run([sys.executable, "-c", _CANDIDATO_FRIO, self.directorio, ruta],
+                       cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True)
+
+    def _medir(self, nombre, funcion, entradas, elementos_por_llamada=1):
+        """
+        Ejecuta `funcion` sobre cada entrada (silenciando sus mensajes) y resume los tiempos de la etapa.
+        :return: Lista con el resultado de cada llamada.
+        """
+        tiempos, salidas = [], []
+        reiniciar_rss_pico()  # el pico de memoria se mide por etapa, no el de todo el proceso
+        with contextlib.redirect_stdout(io.StringIO()):
+            for entrada in entradas:
+                inicio = time.perf_counter()
+                salidas.append(funcion(entrada))
+                tiempos.append(time.perf_counter() - inicio)
+
+        tiempos = np.array(tiempos)
+        self.resultados[nombre] = {
+            "llamadas": len(tiempos),
+            "total_s": float(tiempos.sum()),
+            "media_ms": float(tiempos.mean() * 1000),
+            "p50_ms": float(np.percentile(tiempos, 50) * 1000),
+            "p99_ms": float(np.percentile(tiempos, 99) * 1000),
+            "throughput_por_s": float(len(tiempos) * elementos_por_llamada / max(tiempos.sum(), 1e-12)),
+            "rss_pico_mb": rss_pico_mb(),
+        }
+        print(f"{nombre}: p50 {self.resultados[nombre]['p50_ms']:.3f} ms, "
+              f"p99 {self.resultados[nombre]['p99_ms']:.3f} ms, {self.resultados[nombre]['throughput_por_s']:.1f}/s")
+        return salidas
+
+    def ejecutar(self):
+        """
+        Genera el corpus y mide cada etapa del flujo por separado.
+        :return: Diccionario con los metadatos de la corrida y las métricas de cada etapa.
+        """
+        archivos = self.generar_corpus()
+        rutas = [os.path.join(self.crudos_path, file_name) for file_name in archivos]
+        procesador, parametrizador, knn = self._componentes()
+        repetir = range(self.repeticiones)
+
+        # Etapas del preprocesamiento, archivo por archivo
+        audios = [a for a, _ in self._medir("decodificacion", lambda r: procesador.decodificador.cargar(r, sr=self.sr), rutas)]
+        filtrados = self._medir("butter_bandpass_filter", procesador._butter_bandpass_filter, audios)
+        sin_silencio = self._medir("remove_silence", lambda a: procesador._remove_silence(a, self.sr), filtrados)
+        procesados = [procesador._adjust_duration(procesador._normalize_audio(a)) for a in sin_silencio]
+        self._medir("procesar_lote", procesador.procesar_lote, [audios] * self.repeticiones,
+                    elementos_por_llamada=len(audios))
+        rng = np.random.default_rng(self.semilla)
+        self._medir("augment_audio", lambda a: procesador._augment_audio(a, self.sr, rng=rng), procesados)
+        self._medir("extraer_caracteristicas", lambda a: parametrizador._extraer_caracteristicas(a, self.sr), procesados)
+
+        # Base de datos completa (sin escribir los audios) y almacén del candidato
+        self._medir("base_datos_en_memoria", lambda _: parametrizador.procesar_flujo(
+            procesador.generar_aumentaciones(), self.sr), [None], elementos_por_llamada=len(archivos))
+        with contextlib.redirect_stdout(io.StringIO()):
+            parametrizador.guardar_candidato(parametrizador.parametrizar_audios(np.stack(procesados[:1]), self.sr))
+
+        # k-NN
+        self._medir("knn_cargar_datos", lambda _: knn.cargar_datos(), repetir)
+        self._medir("knn_clasificar", lambda _: knn.clasificar(), repetir)
+        for usar_pca in (True, False):
+            nombre = "loo_barrido_k_pca" if usar_pca else "loo_barrido_k_sin_pca"
+            self._medir(nombre, lambda _: EvaluadorLOO(knn.X, knn.y, knn.pesos, usar_pca).predicciones(1, 20),
+                        range(max(1, self.repeticiones // 10)), elementos_por_llamada=len(knn.X))
+
+        # Latencia de un candidato: en frío (un proceso nuevo que importa todo y carga modelo y escalador
+        # desde disco) y en caliente (componentes ya cargados en este proceso)
+        clasificador = ClasificadorAudios()
+        clasificador.procesador, clasificador.parametrizador, clasificador.knn = self._componentes()
+        with contextlib.redirect_stdout(io.StringIO()):
+            clasificador.clasificar_audio(rutas[0])  # el modelo queda guardado en disco
+        self._medir("candidato_frio", self._clasificar_en_proceso_nuevo, rutas[:max(1, self.repeticiones // 10)])
+        self._medir("candidato_caliente", clasificador.clasificar_audio,
+                    [rutas[i % len(rutas)] for i in repetir])
+
+        return {
+            "corpus": {"clases": self.clases, "n_por_clase": self.n_por_clase, "semilla": self.semilla},
+            "repeticiones": self.repeticiones,
+            "rss_pico_mb": max((etapa["rss_pico_mb"] for etapa in self.resultados.values()
+                                if etapa["rss_pico_mb"] is not None), default=None),
+            "etapas": self.resultados,
+        }
+
+    @staticmethod
+    def combinar(resultados):
+        """
+        Combina varias corridas en una: cada métrica de cada etapa es la mediana entre corridas,
+        lo que reduce el ruido de una corrida aislada al comparar con una referencia.
+        """
+        combinado = dict(resultados[0], corridas=len(resultados), etapas={})
+        for etapa, metricas in resultados[0]["etapas"].items():
+            combinado["etapas"][etapa] = {
+                nombre: (None if valor is None else float(np.median([r["etapas"][etapa][nombre] for r in resultados])))
+                for nombre, valor in metricas.items()
+            }
+        return combinado
+
+    @staticmethod
+    def comparar(resultado, baseline, tolerancia=0.2, delta_minimo_ms=1.0):
+        """
+        Compara el p50 de cada etapa con el de una corrida de referencia.
+        :param tolerancia: Aumento relativo del p50 a partir del cual se considera una regresión.
+        :param delta_minimo_ms: Aumento absoluto mínimo del p50 para considerarlo una regresión
+                                (evita marcar como regresión la variación normal de las etapas de pocos ms).
+        :return: Lista de (etapa, p50 de referencia, p50 actual, cambio relativo) de las etapas que empeoraron.
+        """
+        regresiones = []
+        for etapa, metricas in resultado["etapas"].items():
+            referencia = baseline["etapas"].get(etapa)
+            if referencia is None or referencia["p50_ms"] <= 0:
+                continue
+            cambio = metricas["p50_ms"] / referencia["p50_ms"] - 1.0
+            if cambio > tolerancia and metricas["p50_ms"] - referencia["p50_ms"] > delta_minimo_ms:
+                regresiones.append((etapa, referencia["p50_ms"], metricas["p50_ms"], cambio))
+        return regresiones
+
+
+# Punto de entrada para el banco de rendimiento
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento por etapa con un corpus sintético.")
+    parser.add_argument("--n-por-clase", type=int, default=10)
+    parser.add_argument("--clases", type=int, default=4)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--directorio", default=None, help="Carpeta de trabajo (por defecto una temporal).")
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON con los resultados.")
+    parser.add_argument("--baseline", default=None, help="JSON de una corrida anterior con el que comparar.")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--delta-minimo-ms", type=float, default=1.0,
+                        help="Aumento absoluto mínimo del p50 (ms) para considerar una regresión.")
+    parser.add_argument("--corridas", type=int, default=3, help="Corridas a combinar por la mediana.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporal:
+        banco = BancoRendimiento(args.directorio or temporal, args.n_por_clase, args.clases, args.repeticiones, args.semilla)
+        resultado = BancoRendimiento.combinar([banco.ejecutar() for _ in range(max(1, args.corridas))])
+
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            regresiones = BancoRendimiento.comparar(resultado, json.load(archivo), args.tolerancia,
+                                                   args.delta_minimo_ms)
+        for etapa, antes, despues, cambio in regresiones:
+            print(f"Regresión en {etapa}: p50 {antes:.3f} ms -> {despues:.3f} ms (+{cambio * 100:.0f}%)")
+        if regresiones:
+            raise SystemExit(1)
+        print("Sin regresiones respecto de la referencia.")
@@ -0,0 +1,207 @@
+import math
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.decomposition import PCA
+from sklearn.model_selection import StratifiedKFold
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from EvaluadorLOO import votar_por_k
+from SelectorParametros import seleccionar_por_correlacion
+from Instrumentacion import registro
+
+# Datos de solo lectura de cada proceso del pool (se cargan una vez por proceso)
+_DATOS = {}
+
+
+def _inicializar_proceso(ruta_almacen, X, y):
+    """
+    Carga los datos compartidos en el proceso: desde el almacén memory-mapped (sin copias) o desde arreglos.
+    """
+    if ruta_almacen is not None:
+        almacen = AlmacenCaracteristicas(ruta_almacen).cargar()
+        X, y = almacen.X, almacen.etiquetas
+    clases, y_codificado = np.unique(y, return_inverse=True)
+    _DATOS["X"] = X
+    _DATOS["y"] = y_codificado
+    _DATOS["n_clases"] = len(clases)
+
+
+def _evaluar_grupo(train, test, preprocesamiento, configuraciones):
+    """
+    Evalúa en un fold todas las configuraciones (k, pesos) que comparten el mismo preprocesamiento:
+    la selección, el escalado, el PCA y la búsqueda de vecinos se hacen una sola vez para el k máximo.
+    :return: Lista de (configuración, precisión en el fold).
+    """
+    umbral, escalar, usar_pca, n_componentes = preprocesamiento
+    X, y = _DATOS["X"], _DATOS["y"]
+    X_train, X_test = np.asarray(X[train], dtype=np.float64), np.asarray(X[test], dtype=np.float64)
+
+    columnas = seleccionar_por_correlacion(X_train, umbral)
+    X_train, X_test = X_train[:, columnas], X_test[:, columnas]
+    if escalar:
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    if usar_pca:
+        pca = PCA(n_components=n_componentes).fit(X_train)
+        X_train, X_test = pca.transform(X_train), pca.transform(X_test)
+
+    # (los k mayores que el fold de entrenamiento se descartan antes, en `_configuraciones`)
+    k_max = max(k for k, _ in configuraciones)
+    distancias, indices = NearestNeighbors(n_neighbors=k_max).fit(X_train).kneighbors(X_test)
+    etiquetas_vecinos = y[train][indices]
+
+    resultados = []
+    for pesos in {pesos for _, pesos in configuraciones}:
+        ks = [k for k, p in configuraciones if p == pesos]
+        predicciones = votar_por_k(distancias, etiquetas_vecinos, _DATOS["n_clases"], pesos, ks)
+        for k in ks:
+            resultados.append(((k, pesos), float(np.mean(predicciones[k] == y[test]))))
+    return resultados
+
+
+class BarridoHiperparametros:
+    GRILLA_POR_DEFECTO = {
+        "k": list(range(1, 21)),
+        "pesos": ["uniform", "distance"],
+        "usar_pca": [True, False],
+        "n_componentes": [3],
+        "correlation_threshold": [0.95, None],
+        "escalar": [True, False],
+    }
+
+    def __init__(self, X=None, y=None, ruta_almacen=None, grilla=None, n_splits=5, semilla=0,
+                 workers=1, eta=3, folds_iniciales=1):
+        """
+        Barrido de hiperparámetros del k-NN con validación cruzada estratificada y successive halving.
+        Los folds se calculan una sola vez y, dentro de cada fold, todas las configuraciones que comparten
+        el preprocesamiento (umbral de correlación, escalado, PCA) reutilizan la misma búsqueda de vecinos.
+        :param X: Matriz (N, d) de características (alternativa a `ruta_almacen`).
+        :param y: Etiquetas de cada fila.
+        :param ruta_almacen: Ruta de un `AlmacenCaracteristicas`; los procesos lo abren memory-mapped.
+        :param grilla: Diccionario con las listas de valores de cada hiperparámetro (ver GRILLA_POR_DEFECTO).
+        :param n_splits: Número de folds.
+        :param semilla: Semilla para mezclar los folds (None para no mezclar, como `cross_val_score`).
+        :param workers: Número de procesos a usar.
+        :param eta: Factor de successive halving: en cada ronda se conserva 1/eta de las configuraciones
+                    y se multiplica por eta el número de folds evaluados. None evalúa todo en todos los folds.
+        :param folds_iniciales: Folds evaluados en la primera ronda de successive halving.
+        """
+        if ruta_almacen is not None:
+            almacen = AlmacenCaracteristicas(ruta_almacen).cargar()
+            X, y = almacen.X, almacen.etiquetas
+        self.ruta_almacen = ruta_almacen
+        self.X = X
+        self.y = np.asarray(y)
+        self.grilla = dict(self.GRILLA_POR_DEFECTO, **(grilla or {}))
+        self.n_splits = n_splits
+        self.workers = workers
+        self.eta = eta
+        self.folds_iniciales = folds_iniciales if eta else n_splits
+
+        particion = StratifiedKFold(n_splits=n_splits, shuffle=semilla is not None, random_state=semilla)
+        self.folds = list(particion.split(np.zeros(len(self.y)), self.y))
+
+    def _configuraciones(self):
+        """
+        Todas las combinaciones de la grilla como tuplas (preprocesamiento, (k, pesos)).
+        El PCA con distinto número de componentes solo se combina con usar_pca=True, y se omiten (con una
+        advertencia) los k mayores que el menor fold de entrenamiento, que no se podrían evaluar con ese k.
+        """
+        g = self.grilla
+        k_maximo = min(len(train) for train, _ in self.folds)
+        omitidos = sorted(k for k in g["k"] if k > k_maximo)
+        if omitidos:
+            registro.warning(f"Advertencia: Se omiten los k {omitidos}: superan los {k_maximo} ejemplos "
+                             f"del menor fold de entrenamiento.")
+        ks = [k for k in g["k"] if k <= k_maximo]
+        configuraciones = []
+        for umbral, escalar, usar_pca in itertools.product(g["correlation_threshold"], g["escalar"], g["usar_pca"]):
+            componentes = g["n_componentes"] if usar_pca else [None]
+            for n_componentes, k, pesos in itertools.product(componentes, ks, g["pesos"]):
+                configuraciones.append(((umbral, escalar, usar_pca, n_componentes), (k, pesos)))
+        return configuraciones
+
+    def _evaluar(self, configuraciones, folds, executor):
+        """
+        Evalúa las configuraciones en los folds indicados, agrupando por fold y preprocesamiento.
+        :return: Diccionario {configuración: [precisión por fold]}.
+        """
+        grupos = {}
+        for preprocesamiento, k_pesos in configuraciones:
+            grupos.setdefault(preprocesamiento, []).append(k_pesos)
+
+        tareas = [(self.folds[f][0], self.folds[f][1], preprocesamiento, k_pesos)
+                  for f in folds for preprocesamiento, k_pesos in grupos.items()]
+        if executor is not None:
+            salidas = executor.map(_evaluar_grupo, *zip(*tareas))
+        else:
+            salidas = (_evaluar_grupo(*tarea) for tarea in tareas)
+
+        puntajes = {}
+        for (_, _, preprocesamiento, _), salida in zip(tareas, salidas):
+            for k_pesos, precision in salida:
+                puntajes.setdefault((preprocesamiento, k_pesos), []).append(precision)
+        return puntajes
+
+    def ejecutar(self):
+        """
+        Ejecuta el barrido.
+        :return: DataFrame con una fila por configuración: hiperparámetros, precisión media y desvío,
+                 folds evaluados y ronda en la que se descartó (vacío si llegó a la última ronda).
+        """
+        vivas = self._configuraciones()
+        puntajes = {configuracion: [] for configuracion in vivas}
+        descartadas = {}
+        folds_hechos = 0
+        n_folds = min(self.folds_iniciales, self.n_splits)
+        ronda = 0
+
+        executor = None
+        if self.workers > 1:
+            X, y = (None, None) if self.ruta_almacen is not None else (self.X, self.y)
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_inicializar_proceso,
+                                           initargs=(self.ruta_almacen, X, y))
+        else:
+            _inicializar_proceso(None, self.X, self.y)
+
+        try:
+            while True:
+                nuevos = self._evaluar(vivas, range(folds_hechos, n_folds), executor)
+                for configuracion, valores in nuevos.items():
+                    puntajes[configuracion].extend(valores)
+                folds_hechos = n_folds
+                if folds_hechos >= self.n_splits:
+                    break
+
+                # Successive halving: conservar la mejor fracción 1/eta y evaluar más folds
+                vivas.sort(key=lambda c: np.mean(puntajes[c]), reverse=True)
+                conservar = max(1, math.ceil(len(vivas) / self.eta))
+                for configuracion in vivas[conservar:]:
+                    descartadas[configuracion] = ronda
+                vivas = vivas[:conservar]
+                n_folds = min(self.n_splits, n_folds * self.eta)
+                ronda += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        filas = []
+        for (umbral, escalar, usar_pca, n_componentes), (k, pesos) in puntajes:
+            valores = puntajes[((umbral, escalar, usar_pca, n_componentes), (k, pesos))]
+            filas.append({
+                "k": k,
+                "pesos": pesos,
+                "usar_pca": usar_pca,
+                "n_componentes": n_componentes,
+                "correlation_threshold": umbral,
+                "escalar": escalar,
+                "precision_media": float(np.mean(valores)),
+                "precision_std": float(np.std(valores)),
+                "folds_evaluados": len(valores),
+                "descartada_en_ronda": descartadas.get(((umbral, escalar, usar_pca, n_componentes), (k, pesos))),
+            })
+        resultados = pd.DataFrame(filas)
+        return resultados.sort_values(["folds_evaluados", "precision_media"], ascending=False, ignore_index=True)
@@ -0,0 +1,81 @@
+import os
+import hashlib
+import numpy as np
+from Instrumentacion import registro
+
+
+class CacheCaracteristicas:
+    def __init__(self, cache_path, firma):
+        """
+        Cache persistente de características indexado por el contenido de cada archivo.
+        La clave es el hash SHA-1 del archivo; la cache completa se invalida si cambia la
+        firma del extractor (versión y parámetros como n_mfcc o la lista de bandas).
+        :param cache_path: Ruta al archivo .npz donde se persiste la cache.
+        :param firma: Firma del extractor con el que se calcularon las características.
+        """
+        self.cache_path = cache_path
+        self.firma = firma
+        self.entradas = {}
+        self.usadas = set()
+        self.aciertos = 0
+        self.fallos = 0
+        self._cargar()
+
+    def _cargar(self):
+        """
+        Carga la cache desde disco si existe y corresponde a la misma firma.
+        """
+        if not os.path.exists(self.cache_path):
+            return
+        datos = np.load(self.cache_path, allow_pickle=False)
+        if str(datos["firma"]) != self.firma:
+            registro.warning("La cache de características corresponde a otra versión del extractor; se descarta.")
+            return
+        self.entradas = dict(zip(datos["claves"].tolist(), datos["valores"]))
+
+    @staticmethod
+    def hash_archivo(file_path):
+        """
+        Calcula el hash SHA-1 del contenido de un archivo.
+        """
+        sha1 = hashlib.sha1()
+        with open(file_path, "rb") as archivo:
+            for bloque in iter(lambda: archivo.read(1 << 20), b""):
+                sha1.update(bloque)
+        return sha1.hexdigest()
+
+    def obtener(self, clave):
+        """
+        Devuelve las características asociadas a la clave, o None si no están en cache.
+        Actualiza los contadores de aciertos y fallos.
+        """
+        self.usadas.add(clave)
+        if clave in self.entradas:
+            self.aciertos += 1
+            return self.entradas[clave]
+        self.fallos += 1
+        return None
+
+    def agregar(self, clave, caracteristicas):
+        """
+        Agrega (o reemplaza) las características de una clave.
+        """
+        self.usadas.add(clave)
+        self.entradas[clave] = np.asarray(caracteristicas, dtype=np.float64)
+
+    def reiniciar_contadores(self):
+        self.aciertos = 0
+        self.fallos = 0
+
+    def guardar(self, podar=True):
+        """
+        Persiste la cache en disco.
+        :param podar: Si True, descarta las entradas que no se usaron en esta ejecución
+                      (archivos eliminados o modificados).
+        """
+        if podar:
+            self.entradas = {clave: valor for clave, valor in self.entradas.items() if clave in self.usadas}
+            self.usadas = set()
+        claves = np.array(list(self.entradas.keys()), dtype=str)
+        valores = np.array(list(self.entradas.values()), dtype=np.float64)
+        np.savez(self.cache_path, firma=np.array(self.firma), claves=claves, valores=valores)
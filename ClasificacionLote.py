@@ -0,0 +1,227 @@
+import os
+import csv
+import glob
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ClasificadorAudios import ClasificadorAudios
+from Instrumentacion import metricas, registro
+
+
+class ClasificacionLote:
+    EXTENSIONES = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+    COLUMNAS = ["archivo", "etiqueta", "confianza", "vecinos", "error"]
+
+    def __init__(self, clasificador=None, workers=1, tamano_lote=64, n_vecinos=3):
+        """
+        Clasificación masiva y no interactiva de grabaciones: el preprocesamiento y la extracción de
+        características se reparten en un pool de procesos y la clasificación se hace por lotes vectorizados
+        en el proceso principal, escribiendo cada resultado a medida que se obtiene.
+        :param clasificador: `ClasificadorAudios` a usar (por defecto uno nuevo sin gráficos).
+        :param workers: Número de procesos para preprocesar y parametrizar.
+        :param tamano_lote: Cantidad de audios por tarea del pool y por consulta al índice de vecinos.
+        :param n_vecinos: Cantidad de vecinos más cercanos que se reportan por audio.
+        """
+        clasificador = clasificador if clasificador is not None else ClasificadorAudios(sin_graficos=True)
+        self.procesador = clasificador.procesador
+        self.parametrizador = clasificador.parametrizador
+        self.knn = clasificador.knn
+        self.workers = workers
+        self.tamano_lote = tamano_lote
+        self.n_vecinos = n_vecinos
+
+    def __getstate__(self):
+        # Los procesos del pool solo preprocesan y parametrizan: no se les envía el modelo k-NN
+        estado = self.__dict__.copy()
+        estado["knn"] = None
+        return estado
+
+    @classmethod
+    def listar_entradas(cls, entradas):
+        """
+        Expande las entradas a una lista ordenada de rutas de audio sin duplicados. Cada entrada puede ser:
+        una carpeta (se recorre recursivamente), un manifiesto (.txt con una ruta por línea, o .csv con una
+        columna `archivo`; las rutas relativas lo son a la carpeta del manifiesto) o un patrón glob.
+        """
+        rutas = []
+        for entrada in entradas:
+            if os.path.isdir(entrada):
+                for carpeta, _, archivos in os.walk(entrada):
+                    rutas += [os.path.join(carpeta, archivo) for archivo in archivos
+                              if archivo.lower().endswith(cls.EXTENSIONES)]
+            elif os.path.isfile(entrada) and entrada.lower().endswith((".txt", ".csv")):
+                rutas += cls._leer_manifiesto(entrada)
+            else:
+                encontradas = glob.glob(entrada, recursive=True)
+                if not encontradas:
+                    registro.warning(f"Advertencia: La entrada {entrada} no coincide con ningún archivo.")
+                rutas += [ruta for ruta in encontradas if os.path.isfile(ruta)]
+        return sorted(set(rutas))
+
+    @staticmethod
+    def _leer_manifiesto(manifiesto):
+        carpeta = os.path.dirname(os.path.abspath(manifiesto))
+        with open(manifiesto, encoding="utf-8", newline="") as archivo:
+            if manifiesto.lower().endswith(".csv"):
+                lector = csv.DictReader(archivo)
+                columna = "archivo" if "archivo" in lector.fieldnames else lector.fieldnames[0]
+                rutas = [fila[columna].strip() for fila in lector]
+            else:
+                rutas = [linea.strip() for linea in archivo]
+        return [os.path.join(carpeta, ruta) for ruta in rutas if ruta and not ruta.startswith("#")]
+
+    @staticmethod
+    def _formato(salida, formato=None):
+        if formato is None:
+            formato = "csv" if salida.lower().endswith(".csv") else "jsonl"
+        if formato not in ("csv", "jsonl"):
+            raise ValueError(f"Formato de salida no soportado: {formato} (se admiten 'csv' y 'jsonl').")
+        return formato
+
+    def leer_completados(self, salida, formato=None):
+        """
+        Archivos ya presentes en una salida anterior, para reanudar una corrida interrumpida.
+        Si la última línea quedó incompleta (corte a mitad de escritura) se descarta del archivo.
+        """
+        if not os.path.exists(salida):
+            return set()
+        formato = self._formato(salida, formato)
+        with open(salida, "rb+") as archivo:
+            contenido = archivo.read()
+            if contenido and not contenido.endswith(b"\n"):
+                contenido = contenido[:contenido.rfind(b"\n") + 1]
+                archivo.seek(0)
+                archivo.truncate()
+                archivo.write(contenido)
+        lineas = contenido.decode("utf-8").splitlines()
+        if formato == "csv":
+            return {fila["archivo"] for fila in csv.DictReader(lineas)}
+        return {json.loads(linea)["archivo"] for linea in lineas if linea.strip()}
+
+    def _parametrizar_lote(self, rutas):
+        """
+        Preprocesa y extrae las características (sin escalar) de un lote de rutas.
+        Se ejecuta tanto en serie como dentro de los procesos del pool.
+        :return: Tupla (rutas válidas, matriz (n, d) de características, lista de (ruta, error)).
+        """
+        sr = self.procesador.sampling_rate
+        # Con límite de memoria cada archivo se decodifica y preprocesa por bloques (ver `_process_audio`);
+        # sin límite, el lote se decodifica completo y se preprocesa junto (ver `procesar_lote`)
+        acotado = self.procesador.limite_memoria_mb is not None
+        if not acotado:
+            # Los formatos comprimidos del lote se decodifican en paralelo (ver `DecodificadorAudios`);
+            # un archivo que falla deja su excepción en su lugar sin afectar a los demás
+            cargados = self.procesador.decodificador.cargar_varios(rutas, sr, capturar_errores=True)
+
+        validas, audios, errores = [], [], []
+        for i, ruta in enumerate(rutas):
+            try:
+                if acotado:
+                    audio = self.procesador._process_audio(ruta)
+                else:
+                    if isinstance(cargados[i], Exception):
+                        raise cargados[i]
+                    audio, _ = cargados[i]
+                    if len(audio) == 0:
+                        raise ValueError("El audio está vacío.")
+                audios.append(audio)
+                validas.append(ruta)
+            except Exception as error:
+                registro.debug(f"No se pudo decodificar {ruta}: {error!r}")
+                errores.append((ruta, f"{type(error).__name__}: {error}".rstrip(": ")))
+        if not audios:
+            return validas, None, errores
+        audios = np.stack(audios) if acotado else self.procesador.procesar_lote(audios)
+        audios = audios.astype(np.float32, copy=False)
+        return validas, self.parametrizador._extraer_lote(audios, sr), errores
+
+    def _resultados_lote(self, rutas, caracteristicas, errores):
+        """
+        Clasifica un lote ya parametrizado y arma una fila por archivo, en el orden de entrada.
+        """
+        filas = {ruta: {"archivo": ruta, "etiqueta": None, "confianza": None, "vecinos": [], "error": error}
+                 for ruta, error in errores}
+        if caracteristicas is not None:
+            resultado = self.knn.clasificar_lote(self.parametrizador.scaler.transform(caracteristicas))
+            archivos_referencia = self.knn.base_datos_almacen.archivos
+            y_referencia = self.knn.modelo["y"]
+            n_vecinos = min(self.n_vecinos, resultado["indices"].shape[1])
+            for i, ruta in enumerate(rutas):
+                vecinos = [{"archivo": archivos_referencia[j], "etiqueta": str(y_referencia[j]),
+                            "distancia": float(distancia)}
+                           for j, distancia in zip(resultado["indices"][i, :n_vecinos],
+                                                   resultado["distancias"][i, :n_vecinos])]
+                filas[ruta] = {"archivo": ruta, "etiqueta": str(resultado["predicciones"][i]),
+                               "confianza": float(resultado["votos"][i].max()), "vecinos": vecinos, "error": None}
+        return [filas[ruta] for ruta in sorted(filas)]
+
+    def ejecutar(self, entradas, salida, formato=None, reanudar=True):
+        """
+        Clasifica todas las grabaciones de `entradas` y escribe los resultados en `salida`
+        (archivo, etiqueta, confianza, vecinos más cercanos y, si falló, el error) a medida que se completan.
+        :param entradas: Lista de carpetas, patrones glob o manifiestos (ver `listar_entradas`).
+        :param salida: Archivo de resultados (.csv o .jsonl).
+        :param formato: 'csv' o 'jsonl'; None lo deduce de la extensión de `salida`.
+        :param reanudar: Si True, se omiten los archivos ya presentes en `salida` y se agregan los demás;
+                         si False, `salida` se sobrescribe.
+        :return: Cantidad de archivos clasificados en esta corrida (incluidos los que fallaron).
+        """
+        formato = self._formato(salida, formato)
+        rutas = self.listar_entradas(entradas)
+        completados = self.leer_completados(salida, formato) if reanudar else set()
+        pendientes = [ruta for ruta in rutas if ruta not in completados]
+        registro.info(f"{len(rutas)} audios encontrados, {len(rutas) - len(pendientes)} ya clasificados, "
+                      f"{len(pendientes)} pendientes.")
+        if not pendientes:
+            return 0
+
+        # Modelo y escalador se cargan una vez, antes de repartir el trabajo
+        self.knn.cargar_modelo()
+        self.parametrizador._cargar_escalador()
+
+        lotes = [pendientes[i:i + self.tamano_lote] for i in range(0, len(pendientes), self.tamano_lote)]
+        nuevo = not reanudar or not os.path.exists(salida) or os.path.getsize(salida) == 0
+        clasificados = 0
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            with open(salida, "w" if nuevo else "a", encoding="utf-8", newline="") as archivo:
+                escritor = csv.DictWriter(archivo, fieldnames=self.COLUMNAS) if formato == "csv" else None
+                if escritor is not None and nuevo:
+                    escritor.writeheader()
+                resultados = executor.map(self._parametrizar_lote, lotes) if executor else map(self._parametrizar_lote, lotes)
+                for rutas_lote, caracteristicas, errores in resultados:
+                    for fila in self._resultados_lote(rutas_lote, caracteristicas, errores):
+                        if escritor is not None:
+                            escritor.writerow({**fila, "vecinos": json.dumps(fila["vecinos"], ensure_ascii=False),
+                                               "error": fila["error"] or ""})
+                        else:
+                            archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                    archivo.flush()
+                    clasificados += len(rutas_lote) + len(errores)
+                    metricas.contar("lote.archivos_clasificados", len(rutas_lote))
+                    metricas.contar("lote.errores", len(errores))
+                    for ruta, error in errores:
+                        registro.warning(f"No se pudo clasificar {ruta}: {error}")
+                    registro.info(f"Clasificados {clasificados}/{len(pendientes)} audios.",
+                                  extra={"campos": {"clasificados": clasificados, "pendientes": len(pendientes)}})
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return clasificados
+
+
+# Punto de entrada para la clasificación masiva
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clasificación masiva de grabaciones (sin menú).")
+    parser.add_argument("entradas", nargs="+", help="Carpetas, patrones glob o manifiestos (.txt / .csv).")
+    parser.add_argument("--salida", default="resultados.jsonl", help="Archivo de resultados (.csv o .jsonl).")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--lote", type=int, default=64, help="Audios por lote.")
+    parser.add_argument("--vecinos", type=int, default=3, help="Vecinos más cercanos a reportar por audio.")
+    parser.add_argument("--reiniciar", action="store_true", help="Sobrescribir la salida en lugar de reanudar.")
+    args = parser.parse_args()
+
+    ClasificacionLote(workers=args.workers, tamano_lote=args.lote, n_vecinos=args.vecinos).ejecutar(
+        args.entradas, args.salida, args.formato, reanudar=not args.reiniciar)
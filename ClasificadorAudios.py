@@ -1,15 +1,97 @@
-from ProcesadorAudios import ProcesadorAudios
-from Parametrizador import Parametrizador
-from Knn import Knn
 import os
 
+# Caché persistente de las funciones compiladas con numba (librosa): debe fijarse antes de importar numba
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Parametros", "cache_numba"))
+
+import time
+import argparse
+import tempfile
+import numpy as np
+import soundfile as sf
+from Knn import Knn
+from Instrumentacion import registro
+
 class ClasificadorAudios:
-    def __init__(self):
-        # Inicializar las clases necesarias
-        self.procesador = ProcesadorAudios()
-        self.parametrizador = Parametrizador()
+    def __init__(self, sin_graficos=None):
+        """
+        :param sin_graficos: Si True, nunca se importa matplotlib (ver `Knn`); None lo toma de CLASIFICADOR_SIN_GRAFICOS.
+        """
+        # El procesador y el parametrizador (scipy.signal, librosa) se crean recién cuando una opción los usa
+        self._procesador = None
+        self._parametrizador = None
         candidato_csv = "DB/Candidato/candidato_parametros.csv"  # Ruta fija al archivo del candidato
-        self.knn = Knn(candidato_csv=candidato_csv)  # Ajustar inicialización del Knn
+        self.knn = Knn(candidato_csv=candidato_csv, sin_graficos=sin_graficos)  # Ajustar inicialización del Knn
+
+    @property
+    def procesador(self):
+        if self._procesador is None:
+            from ProcesadorAudios import ProcesadorAudios
+            self._procesador = ProcesadorAudios()
+        return self._procesador
+
+    @procesador.setter
+    def procesador(self, valor):
+        self._procesador = valor
+
+    @property
+    def parametrizador(self):
+        if self._parametrizador is None:
+            from Parametrizador import Parametrizador
+            self._parametrizador = Parametrizador()
+        return self._parametrizador
+
+    @parametrizador.setter
+    def parametrizador(self, valor):
+        self._parametrizador = valor
+
+    def precalentar(self):
+        """
+        Deja listo el clasificador antes de la primera solicitud: carga el modelo y el escalador e
+        importa y compila (JIT de numba, guardado en `NUMBA_CACHE_DIR`) todo el camino de clasificación
+        clasificando un tono sintético de 1 s a 44.1 kHz escrito en un WAV temporal.
+        :return: Segundos que tomó el precalentamiento.
+        """
+        inicio = time.perf_counter()
+        self.knn.cargar_modelo()
+        self.parametrizador._cargar_escalador()
+
+        sr = 44100
+        tono = 0.5 * np.sin(2 * np.pi * 440.0 * np.arange(sr) / sr).astype(np.float32)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "precalentamiento.wav")
+            sf.write(ruta, tono, sr)
+            self.clasificar_audio(ruta)
+
+        duracion = time.perf_counter() - inicio
+        registro.info(f"Clasificador precalentado en {duracion:.2f} s.", extra={"campos": {"duracion_s": duracion}})
+        return duracion
+
+    def clasificar_audio(self, audio, sr=None, guardar_intermedios=False):
+        """
+        Clasifica un audio en un único paso, manteniendo en memoria todos los intermedios
+        (audio procesado y características), sin pasar por `candidato_procesado.wav` ni por el almacén del candidato.
+        :param audio: Ruta a un archivo de audio o señal (ndarray 1D).
+        :param sr: Frecuencia de muestreo de la señal (obligatoria si `audio` es un ndarray).
+        :param guardar_intermedios: Si True, además guarda el audio procesado y las características del candidato
+                                    en las rutas fijas de siempre (como las opciones 2 y 4 del menú).
+        :return: Etiqueta predicha.
+        """
+        if isinstance(audio, str):
+            if not os.path.isfile(audio):
+                raise FileNotFoundError(f"El archivo {audio} no existe o no es accesible.")
+            processed_audio = self.procesador._process_audio(audio)
+        else:
+            if sr is None:
+                raise ValueError("Se debe indicar la frecuencia de muestreo `sr` al clasificar una señal.")
+            processed_audio = self.procesador.procesar_senal(audio, sr)
+
+        caracteristicas = self.parametrizador.parametrizar_audios(processed_audio[np.newaxis, :],
+                                                                  self.procesador.sampling_rate)
+        if guardar_intermedios:
+            self.procesador.guardar_candidato(processed_audio)
+            self.parametrizador.guardar_candidato(caracteristicas)
+
+        return self.knn.clasificar_lote(caracteristicas)["predicciones"][0]
 
     def mostrar_menu(self):
         # Mostrar el menú interactivo
@@ -20,13 +102,15 @@ class ClasificadorAudios:
         print("4. Extraer características del audio candidato")
         print("5. Clasificar audio candidato (k-NN con PCA)")
         print("6. Clasificar audio candidato (k-NN sin PCA)")
-        print("7. Salir")
+        print("7. Clasificar un audio (todo el proceso en memoria)")
+        print("8. Preprocesar y extraer características de la base de datos (sin escribir los audios aumentados)")
+        print("9. Salir")
 
     def ejecutar_opcion(self, opcion):
         # Ejecutar la opción seleccionada
         if opcion == "1":
             print("Preprocesando audios de la base de datos...")
-            self.procesador.procesar_base_datos()
+            self.procesador.procesar_base_datos(workers=os.cpu_count())
         elif opcion == "2":
             print("Preprocesando audio candidato...")
             candidato_path = input("Ingrese la ruta del audio candidato: ").strip()
@@ -39,23 +123,30 @@ class ClasificadorAudios:
             self.parametrizador.procesar_audio_candidato()
         elif opcion == "5":
             print("Clasificando audio candidato (k-NN con PCA)...")
-            if not os.path.exists(self.knn.base_datos_csv):
-                print(f"Error: El archivo {self.knn.base_datos_csv} no existe. Procesa primero la base de datos.")
-            elif not os.path.exists(self.knn.candidato_csv):
-                print(f"Error: El archivo {self.knn.candidato_csv} no existe. Procesa primero el audio candidato.")
+            if not self.knn.base_datos_almacen.existe:
+                print(f"Error: El almacén {self.knn.base_datos_almacen.ruta} no existe. Procesa primero la base de datos.")
+            elif not self.knn.candidato_almacen.existe:
+                print(f"Error: El almacén {self.knn.candidato_almacen.ruta} no existe. Procesa primero el audio candidato.")
             else:
                 self.knn.usar_pca = True
-                self.knn.cargar_datos()
+                prediccion = self.knn.clasificar_candidato()
                 self.knn.visualizar_datos()
-                prediccion = self.knn.clasificar()
                 print(f"Predicción del audio candidato: {prediccion}")
         elif opcion == "6":
             print("Clasificando audio candidato (k-NN sin PCA)...")
             self.knn.usar_pca = False
-            self.knn.cargar_datos()
-            prediccion = self.knn.clasificar()
+            prediccion = self.knn.clasificar_candidato()
             print(f"Predicción del audio candidato: {prediccion}")
         elif opcion == "7":
+            audio_path = input("Ingrese la ruta del audio a clasificar: ").strip()
+            prediccion = self.clasificar_audio(audio_path)
+            print(f"Predicción del audio: {prediccion}")
+        elif opcion == "8":
+            print("Preprocesando y extrayendo características de la base de datos en memoria...")
+            exportar_wav = input("¿Exportar también los WAV procesados y aumentados? (s/n): ").strip().lower() == "s"
+            aumentaciones = self.procesador.generar_aumentaciones(workers=os.cpu_count(), exportar_wav=exportar_wav)
+            self.parametrizador.procesar_flujo(aumentaciones, self.procesador.sampling_rate)
+        elif opcion == "9":
             print("Saliendo del programa. ¡Hasta luego!")
             return False
         else:
@@ -73,5 +164,13 @@ class ClasificadorAudios:
 
 # Punto de entrada para el programa
 if __name__ == "__main__":
-    clasificador = ClasificadorAudios()
+    parser = argparse.ArgumentParser(description="Clasificador de audios (menú interactivo).")
+    parser.add_argument("--sin-graficos", action="store_true", help="No mostrar gráficos ni importar matplotlib.")
+    parser.add_argument("--precalentar", action="store_true",
+                        help="Cargar el modelo y compilar el camino de clasificación antes de mostrar el menú.")
+    args = parser.parse_args()
+
+    clasificador = ClasificadorAudios(sin_graficos=args.sin_graficos or None)
+    if args.precalentar:
+        clasificador.precalentar()
     clasificador.iniciar()
@@ -0,0 +1,181 @@
+import json
+import socket
+import argparse
+import numpy as np
+from scipy.signal import sosfilt
+from ClasificadorAudios import ClasificadorAudios
+
+
+class ClasificadorStreaming:
+    def __init__(self, clasificador=None, top_db=25.0, hop_length=512, silencio_max=0.5, umbral_db=-50.0,
+                 margen_ruido_db=10.0, calibracion_s=0.25):
+        """
+        Clasificación de audio en vivo: recibe fragmentos de audio (ya a `sampling_rate`), los filtra
+        manteniendo el estado del pasa banda entre fragmentos, detecta el inicio de la voz de forma
+        incremental y emite una clasificación en cuanto se completa una ventana de 2 s de voz.
+        Un bloque es voz si supera el umbral absoluto y el piso de ruido más `margen_ruido_db`, y además está
+        a menos de `top_db` dB del máximo de voz visto. El piso de ruido se estima con los primeros
+        `calibracion_s` segundos (durante los cuales no se detecta voz) y luego sigue a los bloques sin voz.
+        :param clasificador: `ClasificadorAudios` con el modelo a usar (se crea uno si es None).
+        :param top_db: Distancia máxima (dB) al RMS máximo de la voz vista.
+        :param hop_length: Tamaño en muestras de cada bloque analizado.
+        :param silencio_max: Segundos de silencio tras la voz que cierran una emisión antes de los 2 s.
+        :param umbral_db: RMS mínimo (dBFS) de un bloque de voz.
+        :param margen_ruido_db: Cuántos dB por encima del piso de ruido debe estar un bloque de voz.
+        :param calibracion_s: Segundos iniciales con los que se estima el piso de ruido.
+        """
+        self.clasificador = clasificador if clasificador is not None else ClasificadorAudios(sin_graficos=True)
+        self.procesador = self.clasificador.procesador
+        self.sr = self.procesador.sampling_rate
+        self.top_db = top_db
+        self.hop_length = hop_length
+        self.bloques_silencio_max = int(silencio_max * self.sr / hop_length)
+        self.longitud_objetivo = int(self.procesador.target_duration * self.sr)
+        self.umbral_rms = 10.0 ** (umbral_db / 20.0)
+        self.factor_ruido = 10.0 ** (margen_ruido_db / 20.0)
+        self.bloques_calibracion = max(1, int(calibracion_s * self.sr / hop_length))
+
+        # Mismo pasa banda que `ProcesadorAudios._butter_bandpass_filter`, con estado entre fragmentos
+        self.sos = self.procesador._sos_pasabanda(self.sr)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """
+        Reinicia el estado del filtro, del detector y de la emisión en curso.
+        """
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.pendiente = np.zeros(0, dtype=np.float32)
+        self.rms_max = 0.0
+        self.piso_ruido = None  # None hasta completar la calibración
+        self.rms_calibracion = []
+        self.muestras_totales = 0
+        self._reiniciar_emision()
+
+    def _reiniciar_emision(self):
+        self.emision = []
+        self.muestras_emision = 0
+        self.bloques_silencio = 0
+        self.inicio_emision = None
+
+    def _filtrar(self, fragmento):
+        """
+        Filtra un fragmento continuando el estado del filtro del fragmento anterior.
+        """
+        filtrado, self.zi = sosfilt(self.sos, fragmento, zi=self.zi)
+        return filtrado.astype(np.float32, copy=False)
+
+    def _cerrar_emision(self):
+        """
+        Normaliza y ajusta a 2 s la emisión acumulada y la clasifica.
+        """
+        audio = np.concatenate(self.emision)
+        audio = self.procesador._adjust_duration(self.procesador._normalize_audio(audio))
+        caracteristicas = self.clasificador.parametrizador.parametrizar_audios(audio[np.newaxis, :], self.sr)
+        resultado = self.clasificador.knn.clasificar_lote(caracteristicas)
+        evento = {
+            "inicio_s": self.inicio_emision / self.sr,
+            "fin_s": self.muestras_totales / self.sr,
+            "etiqueta": str(resultado["predicciones"][0]),
+            "votos": dict(zip([str(clase) for clase in resultado["clases"]], resultado["votos"][0].tolist())),
+        }
+        self._reiniciar_emision()
+        return evento
+
+    def _es_voz(self, rms):
+        """
+        Clasifica un bloque como voz o no y actualiza el piso de ruido y el máximo de voz.
+        """
+        if self.piso_ruido is None:
+            # Calibración: sin nivel de referencia todavía no se detecta voz
+            self.rms_calibracion.append(rms)
+            if len(self.rms_calibracion) >= self.bloques_calibracion:
+                self.piso_ruido = float(np.mean(self.rms_calibracion))
+            return False
+
+        if rms <= max(self.umbral_rms, self.piso_ruido * self.factor_ruido):
+            # Bloque sin voz: el piso baja de inmediato y sube lentamente
+            self.piso_ruido = rms if rms < self.piso_ruido else 0.95 * self.piso_ruido + 0.05 * rms
+            return False
+        self.rms_max = max(self.rms_max, rms)
+        return 20.0 * np.log10(rms / self.rms_max) > -self.top_db
+
+    def procesar_fragmento(self, fragmento):
+        """
+        Procesa un fragmento de audio y devuelve la lista de clasificaciones que se completaron con él.
+        """
+        eventos = []
+        self.pendiente = np.concatenate((self.pendiente, self._filtrar(np.asarray(fragmento, dtype=np.float32))))
+        n_bloques = len(self.pendiente) // self.hop_length
+
+        for i in range(n_bloques):
+            bloque = self.pendiente[i * self.hop_length:(i + 1) * self.hop_length]
+            rms = float(np.sqrt(np.mean(bloque ** 2)))
+            es_voz = self._es_voz(rms)
+
+            if es_voz:
+                if self.inicio_emision is None:
+                    self.inicio_emision = self.muestras_totales
+                self.emision.append(bloque)
+                self.muestras_emision += len(bloque)
+                self.bloques_silencio = 0
+            elif self.inicio_emision is not None:
+                self.bloques_silencio += 1
+            self.muestras_totales += len(bloque)
+
+            if self.muestras_emision >= self.longitud_objetivo or (
+                    self.inicio_emision is not None and self.bloques_silencio > self.bloques_silencio_max):
+                eventos.append(self._cerrar_emision())
+
+        self.pendiente = self.pendiente[n_bloques * self.hop_length:].copy()
+        return eventos
+
+    def clasificar_flujo(self, fragmentos):
+        """
+        Clasifica un flujo de fragmentos de audio (cualquier iterable de arreglos 1D a `sampling_rate`).
+        Emite cada clasificación en cuanto se completa; al terminar el flujo se clasifica la emisión pendiente.
+        """
+        for fragmento in fragmentos:
+            yield from self.procesar_fragmento(fragmento)
+        if self.muestras_emision > 0:
+            yield self._cerrar_emision()
+
+    @staticmethod
+    def _leer_socket(conexion, tamano=4096):
+        """
+        Convierte los bytes recibidos (PCM float32 little-endian, mono) en fragmentos de audio.
+        """
+        resto = b""
+        while True:
+            datos = conexion.recv(tamano)
+            if not datos:
+                break
+            datos = resto + datos
+            n_utiles = len(datos) - len(datos) % 4
+            resto = datos[n_utiles:]
+            if n_utiles:
+                yield np.frombuffer(datos[:n_utiles], dtype="<f4")
+
+    def escuchar(self, host="127.0.0.1", puerto=8766):
+        """
+        Atiende conexiones TCP locales: cada cliente envía audio PCM float32 a `sampling_rate` y recibe
+        una línea JSON por cada clasificación emitida.
+        """
+        self.clasificador.precalentar()
+        with socket.create_server((host, puerto)) as servidor:
+            print(f"Clasificación en vivo escuchando en {host}:{puerto}")
+            while True:
+                conexion, direccion = servidor.accept()
+                with conexion:
+                    self.reiniciar()
+                    for evento in self.clasificar_flujo(self._leer_socket(conexion)):
+                        conexion.sendall((json.dumps(evento, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+# Punto de entrada para la clasificación en vivo
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clasificación de audio en vivo por socket local.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8766)
+    args = parser.parse_args()
+
+    ClasificadorStreaming().escuchar(args.host, args.puerto)
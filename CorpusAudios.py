@@ -0,0 +1,123 @@
+import os
+import json
+import numpy as np
+import soundfile as sf
+from CacheCaracteristicas import CacheCaracteristicas
+from Instrumentacion import registro
+
+
+class CorpusAudios:
+    def __init__(self, ruta):
+        """
+        Corpus empaquetado de audios de igual duración: una matriz float32 (N, muestras) contigua en
+        `<ruta>.npy` (memory-mapped al leer) y un índice `<ruta>.json` con, por cada fila, el nombre del
+        archivo, su etiqueta, su desplazamiento (en muestras) dentro del corpus y el hash SHA-1 del archivo fuente.
+        Los lectores obtienen vistas sin copia en lugar de abrir y decodificar un WAV por audio.
+        :param ruta: Ruta base del corpus, sin extensión.
+        """
+        self.ruta = ruta
+        self.ruta_matriz = f"{ruta}.npy"
+        self.ruta_indice = f"{ruta}.json"
+        self.audios = None
+        self.indice = None
+
+    @property
+    def existe(self):
+        return os.path.exists(self.ruta_matriz) and os.path.exists(self.ruta_indice)
+
+    @property
+    def sr(self):
+        return self.indice["sr"]
+
+    @property
+    def archivos(self):
+        return [entrada["archivo"] for entrada in self.indice["entradas"]]
+
+    @property
+    def etiquetas(self):
+        return np.array([entrada["etiqueta"] for entrada in self.indice["entradas"]])
+
+    @property
+    def hashes(self):
+        return [entrada["hash"] for entrada in self.indice["entradas"]]
+
+    def __len__(self):
+        return len(self.indice["entradas"])
+
+    def empaquetar(self, folder_path, obtener_etiqueta=None, sr=16000, longitud=32000):
+        """
+        Empaqueta los WAV de una carpeta. Los archivos cuyo hash coincide con el del corpus anterior
+        se copian desde él sin volver a decodificarlos.
+        :param folder_path: Carpeta con los audios (p.ej. `DB/Processed`).
+        :param obtener_etiqueta: Función que asigna la etiqueta a partir del nombre del archivo.
+        :param sr: Frecuencia de muestreo esperada; los archivos con otra se omiten.
+        :param longitud: Número de muestras esperado por audio; los de otra duración se omiten.
+        """
+        anterior = {}
+        if self.existe:
+            self.cargar()
+            anterior = {entrada["hash"]: i for i, entrada in enumerate(self.indice["entradas"])}
+
+        archivos = sorted(file_name for file_name in os.listdir(folder_path) if file_name.endswith(".wav"))
+        validos = []
+        for file_name in archivos:
+            file_path = os.path.join(folder_path, file_name)
+            info = sf.info(file_path)
+            if info.samplerate != sr or info.frames != longitud or info.channels != 1:
+                registro.warning(f"Advertencia: {file_name} no es mono de {longitud} muestras a {sr} Hz; se omite del corpus.")
+                continue
+            validos.append((file_name, CacheCaracteristicas.hash_archivo(file_path)))
+
+        # Se escribe en un archivo temporal para poder reutilizar filas del corpus anterior
+        ruta_temporal = f"{self.ruta}.tmp.npy"
+        audios = np.lib.format.open_memmap(ruta_temporal, mode="w+", dtype=np.float32, shape=(len(validos), longitud))
+        entradas = []
+        reutilizados = 0
+        for i, (file_name, hash_archivo) in enumerate(validos):
+            if hash_archivo in anterior:
+                audios[i] = self.audios[anterior[hash_archivo]]
+                reutilizados += 1
+            else:
+                audios[i], _ = sf.read(os.path.join(folder_path, file_name), dtype="float32")
+            entradas.append({
+                "archivo": file_name,
+                "etiqueta": obtener_etiqueta(file_name) if obtener_etiqueta else None,
+                "offset": i * longitud,
+                "hash": hash_archivo,
+            })
+        audios.flush()
+        del audios
+        self.audios = None
+
+        os.replace(ruta_temporal, self.ruta_matriz)
+        self.indice = {"sr": sr, "longitud": longitud, "entradas": entradas}
+        with open(self.ruta_indice, "w", encoding="utf-8") as archivo:
+            json.dump(self.indice, archivo, ensure_ascii=False)
+        registro.info(f"Corpus empaquetado en {self.ruta_matriz}: {len(entradas)} audios ({reutilizados} reutilizados).")
+        return self.cargar()
+
+    def cargar(self, mmap=True):
+        """
+        Carga el corpus. Con mmap=True la matriz se mapea en memoria en modo lectura (sin copias).
+        """
+        if not self.existe:
+            raise FileNotFoundError(f"El corpus de audios {self.ruta} no existe. Empaquétalo primero.")
+        with open(self.ruta_indice, encoding="utf-8") as archivo:
+            self.indice = json.load(archivo)
+        self.audios = np.load(self.ruta_matriz, mmap_mode="r" if mmap else None)
+        return self
+
+    def __getitem__(self, i):
+        """
+        Vista (sin copia) del audio i, o de un rango de audios si i es un slice.
+        """
+        return self.audios[i]
+
+    def lotes(self, tamano_lote=256):
+        """
+        Recorre el corpus en lotes contiguos.
+        :return: Generador de tuplas (archivos del lote, vista (n, muestras) del lote).
+        """
+        archivos = self.archivos
+        for inicio in range(0, len(archivos), tamano_lote):
+            yield archivos[inicio:inicio + tamano_lote], self.audios[inicio:inicio + tamano_lote]
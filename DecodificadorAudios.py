@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DecodificadorAudios:
+    # Calidad de soxr para cada nivel; 'alta' es la que usa `librosa.load` por defecto
+    CALIDADES = {"alta": "HQ", "media": "LQ", "rapida": "QQ"}
+    COMPRIMIDOS = (".mp3", ".ogg", ".m4a", ".aac", ".opus")
+
+    def __init__(self, calidad="alta", hilos=None):
+        """
+        Decodificación y remuestreo de audios en float32 mono, en reemplazo de `librosa.load`.
+        WAV, FLAC, MP3 y OGG se leen directamente con soundfile (libsndfile); los formatos que libsndfile
+        no soporta se delegan a librosa. No se remuestrea si la frecuencia ya coincide.
+        :param calidad: 'alta' (soxr HQ, idéntico al `librosa.load` de siempre), 'media' (soxr LQ)
+                        o 'rapida' (soxr QQ, interpolación cúbica sin filtro antialiasing).
+        :param hilos: Número de hilos para decodificar formatos comprimidos en `cargar_varios`
+                      (None: los de `ThreadPoolExecutor`).
+        """
+        if calidad not in self.CALIDADES:
+            raise ValueError(f"Calidad de remuestreo no soportada: {calidad} (se admiten 'alta', 'media' y 'rapida').")
+        self.calidad = calidad
+        self.hilos = hilos
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Los remuestreadores de soxr no se pueden serializar: cada proceso crea los suyos
+        estado = self.__dict__.copy()
+        del estado["_local"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._local = threading.local()
+
+    def _remuestreador(self, sr_origen, sr_destino, dtype=np.float32):
+        """
+        Remuestreador polifásico de soxr cacheado por par de frecuencias y tipo de dato (uno por hilo, ya que
+        guardan estado); se reinicia antes de cada señal, con el mismo resultado que `soxr.resample` sin volver
+        a diseñar el filtro. Las frecuencias pueden no ser enteras (p.ej. sr / rate en el cambio de tono).
+        """
+        import soxr
+
+        remuestreadores = getattr(self._local, "remuestreadores", None)
+        if remuestreadores is None:
+            remuestreadores = self._local.remuestreadores = {}
+        clave = (sr_origen, sr_destino, np.dtype(dtype).name)
+        if clave not in remuestreadores:
+            remuestreadores[clave] = soxr.ResampleStream(sr_origen, sr_destino, 1, dtype=np.dtype(dtype).name,
+                                                         quality=self.CALIDADES[self.calidad])
+        remuestreador = remuestreadores[clave]
+        remuestreador.clear()
+        return remuestreador
+
+    def remuestrear(self, audio, sr_origen, sr_destino, dtype=np.float32):
+        """
+        Remuestrea una señal 1D; si las frecuencias coinciden la devuelve sin copiarla.
+        La longitud de salida es la de `librosa.resample` (ceil(n * sr_destino / sr_origen)).
+        :param dtype: Tipo de dato del remuestreo ('float32' o 'float64'; `librosa.resample` conserva el de la señal).
+        """
+        if sr_origen == sr_destino:
+            return audio
+        longitud = int(np.ceil(len(audio) * sr_destino / sr_origen))
+        audio = np.ascontiguousarray(audio, dtype=dtype)
+        remuestreado = self._remuestreador(sr_origen, sr_destino, dtype).resample_chunk(audio, last=True)
+        if len(remuestreado) >= longitud:
+            return remuestreado[:longitud]
+        return np.pad(remuestreado, (0, longitud - len(remuestreado)))
+
+    @staticmethod
+    def _leer(ruta):
+        try:
+            # Igual que `librosa.load`: sin el `seek(0)` previo de `sf.read`, que en MP3 cambia levemente
+            # las muestras decodificadas
+            with sf.SoundFile(ruta) as archivo:
+                audio, sr = archivo.read(dtype="float32", always_2d=False), archivo.samplerate
+        except RuntimeError:
+            # Formato no soportado por libsndfile (p.ej. m4a): se decodifica con librosa (audioread)
+            import librosa
+
+            return librosa.load(ruta, sr=None, mono=True)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+        return audio, sr
+
+    def cargar(self, ruta, sr=None):
+        """
+        Decodifica un archivo a float32 mono.
+        :param sr: Frecuencia de salida; None conserva la del archivo.
+        :return: Tupla (audio, sr).
+        """
+        audio, sr_archivo = self._leer(ruta)
+        if sr is None:
+            return audio, sr_archivo
+        return self.remuestrear(audio, sr_archivo, sr), sr
+
+    def cargar_varios(self, rutas, sr=None, capturar_errores=False):
+        """
+        Decodifica varios archivos conservando el orden. Los comprimidos (mp3, ogg, ...) se decodifican en
+        un pool de hilos (libsndfile libera el GIL); WAV y FLAC se leen directamente en el hilo actual.
+        :param capturar_errores: Si True, un archivo que no se puede decodificar no interrumpe el resto:
+                                 en su posición se devuelve la excepción en lugar de la tupla.
+        :return: Lista de tuplas (audio, sr) (o excepciones, con `capturar_errores`).
+        """
+        def cargar(ruta):
+            if not capturar_errores:
+                return self.cargar(ruta, sr)
+            try:
+                return self.cargar(ruta, sr)
+            except Exception as error:
+                return error
+
+        comprimidos = [i for i, ruta in enumerate(rutas) if ruta.lower().endswith(self.COMPRIMIDOS)]
+        cargados = [None] * len(rutas)
+        if len(comprimidos) > 1:
+            with ThreadPoolExecutor(max_workers=self.hilos) as executor:
+                for i, resultado in zip(comprimidos, executor.map(lambda i: cargar(rutas[i]), comprimidos)):
+                    cargados[i] = resultado
+        for i, ruta in enumerate(rutas):
+            if cargados[i] is None:
+                cargados[i] = cargar(ruta)
+        return cargados
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import numpy as np
 from Knn import Knn
+from AlmacenCaracteristicas import AlmacenCaracteristicas
 
 class AnalizadorErrores:
     def __init__(self, k=4):
@@ -10,16 +11,15 @@ class AnalizadorErrores:
         :param k: Valor de k para k-NN.
         """
         self.k = k
-        self.parametros_db_path = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\base_datos_aumentada_parametros.csv"
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.parametros_db = AlmacenCaracteristicas(os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros"))
         self.knn = Knn(candidato_csv=None, k=k)
 
     def cargar_base_datos(self):
         """
         Carga la base de datos aumentada.
         """
-        if not os.path.exists(self.parametros_db_path):
-            raise FileNotFoundError(f"La base de datos en {self.parametros_db_path} no existe. Procesa primero los audios.")
-        return pd.read_csv(self.parametros_db_path)
+        return self.parametros_db.cargar().a_dataframe()
 
     def analizar_errores(self):
         """
@@ -66,7 +66,7 @@ class AnalizadorErrores:
 
         # Guardar resumen de errores en un CSV
         errores_df = pd.DataFrame(resumen_errores)
-        errores_path = os.path.join(os.path.dirname(self.parametros_db_path), f"resumen_errores_k_{self.k}.csv")
+        errores_path = os.path.join(os.path.dirname(self.parametros_db.ruta), f"resumen_errores_k_{self.k}.csv")
         errores_df.to_csv(errores_path, index=False)
         print(f"Resumen de errores guardado en: {errores_path}")
 
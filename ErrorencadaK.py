@@ -2,15 +2,17 @@ import os
 import pandas as pd
 import numpy as np
 from Knn import Knn
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from EvaluadorLOO import EvaluadorLOO
 
 class AnalizadorErrores:
-    def __init__(self, base_datos_csv, candidato_csv):
+    def __init__(self, base_datos_path, candidato_csv):
         """
         Clase para analizar errores en el modelo k-NN.
-        :param base_datos_csv: Ruta al archivo CSV de la base de datos aumentada.
+        :param base_datos_path: Ruta (sin extensión) al almacén de la base de datos aumentada.
         :param candidato_csv: Ruta al archivo CSV del audio candidato.
         """
-        self.base_datos_csv = base_datos_csv
+        self.base_datos_path = base_datos_path
         self.candidato_csv = candidato_csv
 
     def analizar_errores_por_rango(self, k_min=2, k_max=20):
@@ -20,38 +22,32 @@ class AnalizadorErrores:
         :param k_max: Valor máximo de k.
         """
         # Cargar datos
-        base_datos = pd.read_csv(self.base_datos_csv)
-        X = base_datos.drop(columns=["Archivo", "Etiqueta"]).values
-        y_true = base_datos["Etiqueta"].values
+        base_datos = AlmacenCaracteristicas(self.base_datos_path).cargar()
+        X = base_datos.X
+        y_true = base_datos.etiquetas
+        archivos = base_datos.archivos
+
+        # Una única búsqueda de vecinos para todos los k (con la misma configuración por defecto que Knn)
+        knn = Knn(candidato_csv=self.candidato_csv)
+        evaluador = EvaluadorLOO(X, y_true, pesos=knn.pesos, usar_pca=knn.usar_pca)
+        predicciones_por_k = evaluador.predicciones(k_min, k_max)
 
         # Inicializar resultados
         resultados = []
 
-        # Iterar sobre el rango de k
         for k in range(k_min, k_max + 1):
-            print(f"Analizando errores para k = {k}...")
-            knn = Knn(candidato_csv=self.candidato_csv, k=k)
-            errores = []
-            aciertos = 0
-
-            # Iterar sobre cada punto de la base de datos como candidato
-            for i in range(len(X)):
-                knn.X = np.delete(X, i, axis=0)  # Base de datos sin el punto actual
-                knn.y = np.delete(y_true, i)     # Etiquetas sin el punto actual
-                knn.candidato_X = X[i].reshape(1, -1)  # Punto actual como candidato
-                prediccion = knn.clasificar()
-
-                if prediccion == y_true[i]:
-                    aciertos += 1
-                else:
-                    errores.append({
-                        "Archivo": base_datos.iloc[i]["Archivo"],
-                        "Etiqueta Verdadera": y_true[i],
-                        "Predicción": prediccion
-                    })
+            predicciones = predicciones_por_k[k]
+            errores = [
+                {
+                    "Archivo": archivos[i],
+                    "Etiqueta Verdadera": y_true[i],
+                    "Predicción": predicciones[i]
+                }
+                for i in np.flatnonzero(predicciones != y_true)
+            ]
 
             # Calcular precisión
-            precision = aciertos / len(X)
+            precision = 1 - len(errores) / len(X)
             print(f"Precisión para k = {k}: {precision:.4f}")
 
             # Guardar resultados
@@ -70,10 +66,11 @@ class AnalizadorErrores:
         return resultados
 
 if __name__ == "__main__":
-    base_datos_csv = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\base_datos_aumentada_parametros.csv"
-    candidato_csv = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\candidato_parametros.csv"
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    base_datos_path = os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros")
+    candidato_csv = os.path.join(base_dir, "Parametros", "candidato_parametros.csv")
 
-    analizador = AnalizadorErrores(base_datos_csv, candidato_csv)
+    analizador = AnalizadorErrores(base_datos_path, candidato_csv)
     resultados = analizador.analizar_errores_por_rango(k_min=2, k_max=20)
 
     # Opcional: Guardar resultados en un archivo CSV
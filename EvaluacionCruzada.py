@@ -3,6 +3,8 @@ import pandas as pd
 from ProcesadorAudios import ProcesadorAudios
 from Parametrizador import Parametrizador
 from Knn import Knn
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from BarridoHiperparametros import BarridoHiperparametros
 from sklearn.model_selection import train_test_split
 
 
@@ -15,9 +17,10 @@ class Puntuador:
         :param n_splits: Número de particiones para validación cruzada.
         """
         # Rutas
-        self.crudos_path = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\DB\Crudos"
-        self.candidato_csv = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\candidato_parametros.csv"
-        self.parametros_db_path = r"C:\Users\berni\Desktop\ProyectoIAaudiosRobusto\Parametros\base_datos_aumentada_parametros.csv"
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.crudos_path = os.path.join(base_dir, "DB", "Crudos")
+        self.candidato_csv = os.path.join(base_dir, "Parametros", "candidato_parametros.csv")
+        self.parametros_db = AlmacenCaracteristicas(os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros"))
         self.procesador = ProcesadorAudios()
         self.parametrizador = Parametrizador()
         self.k_min = k_min
@@ -29,9 +32,7 @@ class Puntuador:
         """
         Carga la base de datos aumentada.
         """
-        if not os.path.exists(self.parametros_db_path):
-            raise FileNotFoundError(f"La base de datos en {self.parametros_db_path} no existe. Procesa primero los audios.")
-        return pd.read_csv(self.parametros_db_path)
+        return self.parametros_db.cargar().a_dataframe()
 
     def obtener_etiqueta_desde_nombre(self, file_name):
         """
@@ -70,11 +71,9 @@ class Puntuador:
         for split in range(self.n_splits):
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=1 / self.n_splits, random_state=split)
 
-            # Usar Knn para entrenar y evaluar
-            knn.X = X_train
-            knn.y = y_train
-            knn.candidato_X = X_test  # En este caso, X_test actúa como candidato temporal
-            predicciones = [knn.clasificar() for _ in range(len(X_test))]
+            # Usar Knn para entrenar y evaluar todo X_test en una sola consulta
+            knn.ajustar(X_train, y_train, escalar=False)
+            predicciones = knn.clasificar_lote(X_test, en_memoria=True)["predicciones"]
             puntaje_split = sum([1 for pred, real in zip(predicciones, y_test) if pred == real]) / len(y_test)
             puntajes_split.append(puntaje_split)
 
@@ -87,24 +86,41 @@ class Puntuador:
         """
         Encuentra el valor de k que maximiza el puntaje promedio con validación cruzada.
         """
-        mejor_k = None
-        mejor_puntaje = 0
-
-        for k in range(self.k_min, self.k_max + 1):
-            puntaje_k = self.evaluar_con_validacion_cruzada(k)
-            self.resultados_k[k] = puntaje_k
-
-            if puntaje_k > mejor_puntaje:
-                mejor_puntaje = puntaje_k
-                mejor_k = k
+        resultados = self.barrer_hiperparametros(
+            grilla={"k": list(range(self.k_min, self.k_max + 1)), "pesos": ["distance"], "usar_pca": [True],
+                    "n_componentes": [3], "correlation_threshold": [None], "escalar": [False]},
+            eta=None,
+        )
+        self.resultados_k = dict(zip(resultados["k"], resultados["precision_media"]))
+        mejor = resultados.sort_values(["precision_media", "k"], ascending=[False, True]).iloc[0]
+        mejor_k, mejor_puntaje = int(mejor["k"]), float(mejor["precision_media"])
 
         # Mostrar resultados finales
         print("\n=== Resultados de Optimización ===")
         print(f"Mejor valor de k: {mejor_k} con puntaje promedio: {mejor_puntaje:.4f}")
         return mejor_k, mejor_puntaje
 
+    def barrer_hiperparametros(self, grilla=None, workers=1, eta=3, output_path=None):
+        """
+        Barrido de hiperparámetros (k, pesos, PCA, umbral de correlación, escalado) con validación cruzada
+        en `n_splits` folds y successive halving, en un pool de procesos que comparte el almacén memory-mapped.
+        :param grilla: Valores de cada hiperparámetro (por defecto `BarridoHiperparametros.GRILLA_POR_DEFECTO`).
+        :param workers: Número de procesos.
+        :param eta: Factor de successive halving (None para evaluar todas las configuraciones en todos los folds).
+        :param output_path: Si se indica, guarda la tabla de resultados en CSV.
+        :return: DataFrame con una fila por configuración.
+        """
+        barrido = BarridoHiperparametros(ruta_almacen=self.parametros_db.ruta, grilla=grilla,
+                                         n_splits=self.n_splits, workers=workers, eta=eta)
+        resultados = barrido.ejecutar()
+        if output_path is not None:
+            resultados.to_csv(output_path, index=False)
+            print(f"Resultados del barrido guardados en {output_path}")
+        return resultados
+
 
 # Punto de entrada para el programa
 if __name__ == "__main__":
     puntuador = Puntuador(k_min=3, k_max=25, n_splits=5)
     puntuador.optimizar_k()
+    puntuador.barrer_hiperparametros(workers=os.cpu_count(), output_path="resultados_barrido.csv")
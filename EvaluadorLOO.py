@@ -0,0 +1,141 @@
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+
+
+class EvaluadorLOO:
+    # Hasta este tamaño el PCA se reajusta sin el punto excluido (resultado idéntico al procedimiento anterior)
+    N_MAX_PCA_EXACTO = 5000
+
+    def __init__(self, X, y, pesos="distance", usar_pca=True, n_componentes=3, pca_exacto=None):
+        """
+        Evaluación leave-one-out de k-NN para todos los k a partir de una única búsqueda de vecinos.
+        Se obtienen una sola vez los k_max vecinos de cada punto (sin contar al propio punto) y las
+        predicciones de cada k se obtienen acumulando los votos ponderados de los primeros k vecinos.
+
+        Con PCA hay dos modos:
+        - exacto: el PCA de cada punto excluido se obtiene actualizando la media y la covarianza
+          (descontando ese punto) y resolviendo un problema de autovalores d x d; da las mismas
+          predicciones que reajustar PCA y k-NN por cada punto, con costo O(N² d).
+        - global: el PCA se ajusta una sola vez con todos los puntos (el punto excluido participa en la
+          proyección) y se usa un índice de vecinos; escala a decenas de miles de puntos.
+        :param X: Matriz (N, d) de características.
+        :param y: Etiquetas de cada fila.
+        :param pesos: 'uniform' o 'distance', con las mismas reglas que `KNeighborsClassifier`.
+        :param usar_pca: Si True, la búsqueda se hace en el espacio PCA.
+        :param n_componentes: Componentes del PCA.
+        :param pca_exacto: True/False para forzar un modo; None elige exacto si N <= N_MAX_PCA_EXACTO.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if pca_exacto is None:
+            pca_exacto = len(X) <= self.N_MAX_PCA_EXACTO
+        self.pca_exacto = usar_pca and pca_exacto
+        self.n_componentes = n_componentes
+        if usar_pca and not pca_exacto:
+            X = PCA(n_components=n_componentes).fit_transform(X)
+        self.X = X
+        self.y = np.asarray(y)
+        self.pesos = pesos
+        self.clases, self.y_codificado = np.unique(self.y, return_inverse=True)
+        self.distancias = None
+        self.indices = None
+
+    def _vecinos(self, k_max):
+        """
+        Obtiene (y reutiliza) los k_max vecinos de cada punto, excluyendo al propio punto.
+        """
+        if self.indices is not None and self.indices.shape[1] >= k_max:
+            return self.distancias[:, :k_max], self.indices[:, :k_max]
+
+        n = len(self.X)
+        if self.pca_exacto:
+            self.distancias, self.indices = self._vecinos_pca_exacto(min(k_max, n - 1))
+            return self.distancias, self.indices
+
+        busqueda = NearestNeighbors(n_neighbors=min(k_max + 1, n)).fit(self.X)
+        distancias, indices = busqueda.kneighbors(self.X)
+
+        # Quitar el propio punto (si por empates no aparece, se descarta el vecino más lejano)
+        propio = indices == np.arange(n)[:, None]
+        sin_propio = ~propio
+        sin_propio[~propio.any(axis=1), -1] = False
+        self.distancias = distancias[sin_propio].reshape(n, -1)
+        self.indices = indices[sin_propio].reshape(n, -1)
+        return self.distancias[:, :k_max], self.indices[:, :k_max]
+
+    def _vecinos_pca_exacto(self, k_max):
+        """
+        Vecinos de cada punto en el espacio PCA ajustado sin ese punto.
+        """
+        X = self.X
+        n = len(X)
+        media = X.mean(axis=0)
+        centrado = X - media
+        dispersion = centrado.T @ centrado
+        distancias = np.empty((n, k_max))
+        indices = np.empty((n, k_max), dtype=np.intp)
+        otros = np.ones(n, dtype=bool)
+
+        for i in range(n):
+            # Media y dispersión sin el punto i (actualización de rango 1)
+            desvio = centrado[i]
+            dispersion_i = dispersion - np.outer(desvio, desvio) * n / (n - 1)
+            media_i = (media * n - X[i]) / (n - 1)
+            _, vectores = np.linalg.eigh(dispersion_i)
+            componentes = vectores[:, ::-1][:, :self.n_componentes]
+
+            otros[i] = False
+            proyeccion = (X - media_i) @ componentes
+            d = np.sqrt(np.sum((proyeccion - proyeccion[i]) ** 2, axis=1))
+            d[i] = np.inf
+            cercanos = np.argpartition(d, k_max - 1)[:k_max] if k_max < n - 1 else np.flatnonzero(otros)
+            cercanos = cercanos[np.argsort(d[cercanos], kind="stable")]
+            distancias[i] = d[cercanos]
+            indices[i] = cercanos
+            otros[i] = True
+        return distancias, indices
+
+    def predicciones(self, k_min, k_max):
+        """
+        :return: Diccionario {k: arreglo (N,) con la predicción leave-one-out de cada punto}.
+        """
+        distancias, indices = self._vecinos(k_max)
+        ks = range(k_min, min(k_max, distancias.shape[1]) + 1)
+        predicciones = votar_por_k(distancias, self.y_codificado[indices], len(self.clases), self.pesos, ks)
+        return {k: self.clases[codigos] for k, codigos in predicciones.items()}
+
+
+def votar_por_k(distancias, etiquetas_vecinos, n_clases, pesos, ks):
+    """
+    Predicciones k-NN para varios k a partir de los vecinos ordenados, acumulando los votos de a un vecino.
+    :param distancias: Matriz (M, k_max) con la distancia a cada vecino, de menor a mayor.
+    :param etiquetas_vecinos: Matriz (M, k_max) con la clase codificada (0..n_clases-1) de cada vecino.
+    :param n_clases: Número de clases.
+    :param pesos: 'uniform' o 'distance', con las mismas reglas que `KNeighborsClassifier`.
+    :param ks: Valores de k a evaluar.
+    :return: Diccionario {k: arreglo (M,) con la clase codificada predicha}.
+    """
+    if pesos == "distance":
+        # Un vecino a distancia 0 se lleva todo el voto (igual que KNeighborsClassifier)
+        ceros = distancias == 0
+        with np.errstate(divide="ignore"):
+            pesos_vecinos = np.where(ceros, 0.0, 1.0 / distancias)
+    else:
+        ceros = np.zeros_like(distancias, dtype=bool)
+        pesos_vecinos = np.ones_like(distancias)
+
+    m = len(distancias)
+    filas = np.arange(m)
+    ks = set(ks)
+    votos = np.zeros((m, n_clases))
+    votos_ceros = np.zeros((m, n_clases))
+    resultado = {}
+    for j in range(max(ks)):
+        votos[filas, etiquetas_vecinos[:, j]] += pesos_vecinos[:, j]
+        votos_ceros[filas, etiquetas_vecinos[:, j]] += ceros[:, j]
+        k = j + 1
+        if k in ks:
+            hay_ceros = votos_ceros.sum(axis=1) > 0
+            votos_k = np.where(hay_ceros[:, None], votos_ceros, votos)
+            resultado[k] = np.argmax(votos_k, axis=1)
+    return resultado
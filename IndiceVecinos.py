@@ -0,0 +1,249 @@
+import time
+import numpy as np
+from Instrumentacion import registro
+
+
+class IndiceVecinos:
+    """
+    Interfaz común de los índices de vecinos: `construir(X)` y `consultar(Q, k)`.
+    Cada índice registra el tiempo de construcción y el de la última consulta.
+    """
+    nombre = "base"
+
+    def __init__(self):
+        self.tiempo_construccion = None
+        self.tiempo_ultima_consulta = None
+        self.X = None
+
+    def construir(self, X):
+        inicio = time.perf_counter()
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self._construir()
+        self.tiempo_construccion = time.perf_counter() - inicio
+        return self
+
+    def consultar(self, Q, k):
+        """
+        :param Q: Matriz (M, d) de consultas.
+        :param k: Número de vecinos.
+        :return: (distancias, indices), ambas (M, k), ordenadas de menor a mayor distancia.
+        """
+        inicio = time.perf_counter()
+        Q = np.ascontiguousarray(np.atleast_2d(Q), dtype=np.float64)
+        resultado = self._consultar(Q, min(k, len(self.X)))
+        self.tiempo_ultima_consulta = time.perf_counter() - inicio
+        return resultado
+
+    def _construir(self):
+        pass
+
+    def _consultar(self, Q, k):
+        raise NotImplementedError
+
+
+def _k_menores(distancias2, k):
+    """
+    Índices y distancias de los k menores valores de cada fila de una matriz de distancias al cuadrado.
+    """
+    if k < distancias2.shape[1]:
+        indices = np.argpartition(distancias2, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(distancias2.shape[1]), distancias2.shape).copy()
+    parciales = np.take_along_axis(distancias2, indices, axis=1)
+    orden = np.argsort(parciales, axis=1, kind="stable")
+    indices = np.take_along_axis(indices, orden, axis=1)
+    return np.sqrt(np.maximum(np.take_along_axis(parciales, orden, axis=1), 0.0)), indices
+
+
+def _busqueda_abandono_temprano(X, q, candidatos, k, bloques):
+    """
+    Búsqueda exacta de los k vecinos de `q` entre `candidatos` calculando la distancia por bloques
+    de dimensiones y abandonando los candidatos cuya distancia parcial ya supera a la k-ésima mejor.
+    :param bloques: Lista de arreglos de dimensiones, en orden de mayor a menor varianza.
+    """
+    k = min(k, len(candidatos))
+    # Cota inicial: distancia completa de los k candidatos más cercanos según el primer bloque
+    primero = bloques[0]
+    parcial = np.sum((X[np.ix_(candidatos, primero)] - q[primero]) ** 2, axis=1)
+    semilla = np.argpartition(parcial, k - 1)[:k] if k < len(candidatos) else np.arange(len(candidatos))
+    # (con un margen relativo para que el redondeo de la suma por bloques no descarte a las semillas)
+    cota = np.max(np.sum((X[candidatos[semilla]] - q) ** 2, axis=1)) * (1.0 + 1e-9)
+
+    vivos = parcial <= cota
+    candidatos, parcial = candidatos[vivos], parcial[vivos]
+    for bloque in bloques[1:]:
+        parcial = parcial + np.sum((X[np.ix_(candidatos, bloque)] - q[bloque]) ** 2, axis=1)
+        vivos = parcial <= cota
+        candidatos, parcial = candidatos[vivos], parcial[vivos]
+
+    distancias, orden = _k_menores(parcial[np.newaxis, :], k)
+    return distancias[0], candidatos[orden[0]]
+
+
+class IndiceFuerzaBruta(IndiceVecinos):
+    """
+    Búsqueda exacta por fuerza bruta: ||q - x||² = ||q||² - 2 q·x + ||x||², con el producto en BLAS.
+    Con `abandono_temprano=True` la distancia se calcula por bloques de dimensiones por consulta
+    (útil cuando d es grande y el producto matricial completo no entra en memoria).
+    """
+    nombre = "fuerza_bruta"
+
+    def __init__(self, abandono_temprano=False, tamano_bloque=8, lote_consultas=1024):
+        super().__init__()
+        self.abandono_temprano = abandono_temprano
+        self.tamano_bloque = tamano_bloque
+        self.lote_consultas = lote_consultas
+
+    def _construir(self):
+        self.normas2 = np.einsum("ij,ij->i", self.X, self.X)
+        orden = np.argsort(-self.X.var(axis=0))
+        self.bloques = [orden[i:i + self.tamano_bloque] for i in range(0, len(orden), self.tamano_bloque)]
+
+    def _consultar(self, Q, k):
+        if self.abandono_temprano:
+            todos = np.arange(len(self.X))
+            resultados = [_busqueda_abandono_temprano(self.X, q, todos, k, self.bloques) for q in Q]
+            return np.array([d for d, _ in resultados]), np.array([i for _, i in resultados])
+
+        distancias, indices = [], []
+        for inicio in range(0, len(Q), self.lote_consultas):
+            lote = Q[inicio:inicio + self.lote_consultas]
+            distancias2 = np.einsum("ij,ij->i", lote, lote)[:, None] - 2.0 * lote @ self.X.T + self.normas2
+            d, i = _k_menores(distancias2, k)
+            distancias.append(d)
+            indices.append(i)
+        return np.vstack(distancias), np.vstack(indices)
+
+
+class IndiceArbol(IndiceVecinos):
+    """
+    KD-tree (pocas dimensiones, p.ej. el espacio PCA de 3 componentes) o ball-tree.
+    La poda de ramas del árbol es el equivalente al abandono temprano: las ramas cuya cota
+    inferior supera a la k-ésima mejor distancia no se exploran.
+    """
+    nombre = "arbol"
+
+    def __init__(self, tipo="kd", tamano_hoja=40):
+        super().__init__()
+        self.tipo = tipo
+        self.tamano_hoja = tamano_hoja
+        self.nombre = f"arbol_{tipo}"
+
+    def _construir(self):
+        from sklearn.neighbors import KDTree, BallTree
+
+        clase = KDTree if self.tipo == "kd" else BallTree
+        self.arbol = clase(self.X, leaf_size=self.tamano_hoja)
+
+    def _consultar(self, Q, k):
+        return self.arbol.query(Q, k=k, return_distance=True, sort_results=True)
+
+
+class IndiceIVF(IndiceVecinos):
+    """
+    Índice aproximado tipo IVF: los puntos se agrupan con k-means en `n_listas` listas y cada consulta
+    solo explora las `n_sondas` listas de centroides más cercanos, con abandono temprano por bloques.
+    `calibrar` elige el menor `n_sondas` que alcanza un recall objetivo sobre una muestra.
+    """
+    nombre = "ivf"
+
+    def __init__(self, n_listas=None, n_sondas=8, tamano_bloque=8, semilla=0):
+        super().__init__()
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+        self.tamano_bloque = tamano_bloque
+        self.semilla = semilla
+
+    def _construir(self):
+        from sklearn.cluster import KMeans
+
+        n_listas = self.n_listas or max(1, int(np.sqrt(len(self.X))))
+        kmeans = KMeans(n_clusters=n_listas, n_init=1, random_state=self.semilla).fit(self.X)
+        self.centroides = kmeans.cluster_centers_
+        self.listas = [np.flatnonzero(kmeans.labels_ == c) for c in range(n_listas)]
+        orden = np.argsort(-self.X.var(axis=0))
+        self.bloques = [orden[i:i + self.tamano_bloque] for i in range(0, len(orden), self.tamano_bloque)]
+
+    def _consultar(self, Q, k):
+        n_sondas = min(self.n_sondas, len(self.listas))
+        distancias_centroides = np.sum((Q[:, None, :] - self.centroides[None, :, :]) ** 2, axis=2)
+        sondas = np.argsort(distancias_centroides, axis=1)
+        tamanos = np.array([len(lista) for lista in self.listas])
+
+        distancias = np.empty((len(Q), k))
+        indices = np.empty((len(Q), k), dtype=np.intp)
+        for i, q in enumerate(Q):
+            # Si las listas sondeadas tienen menos de k puntos, se sondean las siguientes más cercanas
+            n = max(n_sondas, int(np.searchsorted(np.cumsum(tamanos[sondas[i]]), k)) + 1)
+            candidatos = np.concatenate([self.listas[c] for c in sondas[i, :n]])
+            distancias[i], indices[i] = _busqueda_abandono_temprano(self.X, q, candidatos, k, self.bloques)
+        return distancias, indices
+
+    def calibrar(self, recall_objetivo, k=10, n_muestra=200):
+        """
+        Aumenta `n_sondas` hasta que el recall@k medido contra la búsqueda exacta alcance el objetivo.
+        Las consultas son puntos de la base, así que cada uno se excluye de sus propios vecinos (si no, el
+        vecino trivial a distancia 0 infla el recall).
+        :return: Recall alcanzado.
+        """
+        k = min(k, len(self.X) - 1)
+        if k < 1:
+            return 1.0
+        rng = np.random.default_rng(self.semilla)
+        seleccion = rng.choice(len(self.X), size=min(n_muestra, len(self.X)), replace=False)
+        muestra = self.X[seleccion]
+
+        def sin_si_mismo(indices):
+            return [fila[fila != propio][:k] for fila, propio in zip(indices, seleccion)]
+
+        _, exactos = IndiceFuerzaBruta().construir(self.X).consultar(muestra, k + 1)
+        exactos = sin_si_mismo(exactos)
+
+        recall = 0.0
+        for n_sondas in range(1, len(self.listas) + 1):
+            self.n_sondas = n_sondas
+            _, aproximados = self._consultar(muestra, k + 1)
+            recall = np.mean([len(np.intersect1d(a, e)) / k for a, e in zip(sin_si_mismo(aproximados), exactos)])
+            if recall >= recall_objetivo:
+                break
+        return recall
+
+
+def seleccionar_indice(n, d, recall_objetivo=1.0):
+    """
+    Elige un índice según el tamaño de la base, la dimensión y el recall exigido:
+    - Búsqueda exacta con pocos puntos (el costo de construir un árbol no se amortiza): fuerza bruta.
+    - Búsqueda exacta en pocas dimensiones (p.ej. PCA de 3 componentes): KD-tree.
+    - Búsqueda exacta en muchas dimensiones: ball-tree, o fuerza bruta con abandono temprano si d es muy grande.
+    - Recall menor a 1 con bases grandes: IVF calibrado al recall objetivo.
+    :return: Instancia (sin construir) del índice elegido.
+    """
+    if recall_objetivo < 1.0 and n >= 50000:
+        return IndiceIVF()
+    if n < 2000:
+        return IndiceFuerzaBruta()
+    if d <= 15:
+        return IndiceArbol("kd")
+    if d <= 50:
+        return IndiceArbol("ball")
+    return IndiceFuerzaBruta(abandono_temprano=True)
+
+
+def construir_indice(X, tipo="auto", recall_objetivo=1.0):
+    """
+    Construye el índice pedido ('auto', 'fuerza_bruta', 'kd', 'ball' o 'ivf') y reporta sus tiempos.
+    """
+    tipos = {
+        "fuerza_bruta": IndiceFuerzaBruta,
+        "kd": lambda: IndiceArbol("kd"),
+        "ball": lambda: IndiceArbol("ball"),
+        "ivf": IndiceIVF,
+    }
+    X = np.asarray(X)
+    indice = seleccionar_indice(len(X), X.shape[1], recall_objetivo) if tipo == "auto" else tipos[tipo]()
+    indice.construir(X)
+    if isinstance(indice, IndiceIVF):
+        recall = indice.calibrar(recall_objetivo)
+        registro.info(f"Índice IVF calibrado con {indice.n_sondas} sondas (recall@10 = {recall:.3f}).")
+    registro.debug(f"Índice de vecinos '{indice.nombre}' construido en {indice.tiempo_construccion:.4f} s para {len(X)} puntos.")
+    return indice
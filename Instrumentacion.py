@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import atexit
+import time
+import bisect
+import logging
+import threading
+
+
+class _ManejadorSalida(logging.StreamHandler):
+    """
+    Escribe en el `sys.stdout` vigente en cada mensaje (como `print`), de modo que redirigir la salida estándar
+    también redirige el registro.
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, valor):
+        pass
+
+
+class _FormatoJSON(logging.Formatter):
+    def format(self, record):
+        contenido = {
+            "ts": round(record.created, 6),
+            "nivel": record.levelname,
+            "modulo": record.module,
+            "mensaje": record.getMessage(),
+        }
+        contenido.update(getattr(record, "campos", {}))
+        return json.dumps(contenido, ensure_ascii=False, default=str)
+
+
+class _Nulo:
+    """
+    Contexto vacío que se devuelve al medir con la instrumentación deshabilitada.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Temporizador:
+    def __init__(self, metricas, nombre):
+        self.metricas = metricas
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metricas.observar(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+class Metricas:
+    # Límites superiores (segundos) de los buckets de los histogramas de duración
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    _NULO = _Nulo()
+
+    def __init__(self, habilitada=False):
+        """
+        Contadores e histogramas de duración del flujo. Deshabilitada, cada llamada retorna de inmediato.
+        Las etapas que corren dentro de los procesos de un pool se registran en esos procesos y no se agregan aquí.
+        """
+        self.habilitada = habilitada
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.contadores = {}
+            self.histogramas = {}
+
+    def medir(self, nombre):
+        """
+        Contexto que registra la duración del bloque en el histograma `nombre`.
+        """
+        if not self.habilitada:
+            return self._NULO
+        return _Temporizador(self, nombre)
+
+    def contar(self, nombre, valor=1):
+        if not self.habilitada:
+            return
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def observar(self, nombre, valor):
+        """
+        Registra una duración (segundos) en el histograma `nombre`.
+        """
+        if not self.habilitada:
+            return
+        with self._lock:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = {"buckets": [0] * (len(self.BUCKETS) + 1), "suma": 0.0,
+                                                         "cuenta": 0}
+            histograma["buckets"][bisect.bisect_left(self.BUCKETS, valor)] += 1
+            histograma["suma"] += valor
+            histograma["cuenta"] += 1
+
+    def instantanea(self):
+        """
+        Copia de las métricas: contadores y, por histograma, cuenta, suma, media y buckets (no acumulados).
+        """
+        with self._lock:
+            return {
+                "contadores": dict(self.contadores),
+                "histogramas": {
+                    nombre: {
+                        "cuenta": h["cuenta"],
+                        "suma_s": h["suma"],
+                        "media_s": h["suma"] / max(h["cuenta"], 1),
+                        "buckets": dict(zip([str(b) for b in self.BUCKETS] + ["+Inf"], h["buckets"])),
+                    }
+                    for nombre, h in self.histogramas.items()
+                },
+            }
+
+    def exportar_prometheus(self, prefijo="clasificador"):
+        """
+        Métricas en el formato de texto de Prometheus.
+        """
+        lineas = []
+        with self._lock:
+            for nombre, valor in sorted(self.contadores.items()):
+                metrica = f"{prefijo}_{nombre.replace('.', '_')}_total"
+                lineas += [f"# TYPE {metrica} counter", f"{metrica} {valor}"]
+            for nombre, h in sorted(self.histogramas.items()):
+                metrica = f"{prefijo}_{nombre.replace('.', '_')}_segundos"
+                lineas.append(f"# TYPE {metrica} histogram")
+                acumulado = 0
+                for limite, cuenta in zip([str(b) for b in self.BUCKETS] + ["+Inf"], h["buckets"]):
+                    acumulado += cuenta
+                    lineas.append(f'{metrica}_bucket{{le="{limite}"}} {acumulado}')
+                lineas += [f"{metrica}_sum {h['suma']}", f"{metrica}_count {h['cuenta']}"]
+        return "\n".join(lineas) + "\n"
+
+    def guardar(self, path):
+        """
+        Guarda las métricas en `path`: formato Prometheus si termina en .prom, JSON en otro caso.
+        """
+        with open(path, "w", encoding="utf-8") as archivo:
+            if path.endswith(".prom"):
+                archivo.write(self.exportar_prometheus())
+            else:
+                json.dump(self.instantanea(), archivo, ensure_ascii=False, indent=2)
+
+
+def _estado_proceso(campo):
+    """
+    Valor (MB) de un campo de /proc/self/status (Linux), o None si no está disponible.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as archivo:
+            for linea in archivo:
+                if linea.startswith(campo + ":"):
+                    return int(linea.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def rss_actual_mb():
+    """
+    Memoria residente actual del proceso (MB); None si no se puede medir.
+    """
+    return _estado_proceso("VmRSS")
+
+
+def reiniciar_rss_pico():
+    """
+    Reinicia el pico de memoria residente del proceso (Linux), para medirlo por archivo con `rss_pico_mb`.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as archivo:
+            archivo.write("5")
+    except OSError:
+        pass
+
+
+def rss_pico_mb():
+    """
+    Pico de memoria residente (MB) desde el último `reiniciar_rss_pico` (VmHWM en Linux);
+    en otros sistemas, el pico de todo el proceso (ru_maxrss) o None.
+    """
+    pico = _estado_proceso("VmHWM")
+    if pico is not None:
+        return pico
+    try:
+        import resource
+    except ImportError:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024.0 * 1024.0) if sys.platform == "darwin" else maximo / 1024.0
+
+
+# Registro y métricas compartidos por todo el flujo
+registro = logging.getLogger("clasificador")
+metricas = Metricas()
+# Archivo donde se guardan las métricas al terminar el proceso (el de la última llamada a `configurar`)
+_archivo_metricas = None
+_guardado_registrado = False
+
+
+def _guardar_metricas_al_salir():
+    if _archivo_metricas:
+        metricas.guardar(_archivo_metricas)
+
+
+def configurar(nivel=None, formato=None, habilitar_metricas=None, archivo_metricas=None):
+    """
+    Configura el registro y las métricas. Los valores None se toman de las variables de entorno
+    CLASIFICADOR_LOG_NIVEL (por defecto INFO), CLASIFICADOR_LOG_FORMATO ('texto' o 'json'),
+    CLASIFICADOR_METRICAS ('1' para habilitarlas) y CLASIFICADOR_METRICAS_ARCHIVO.
+    Con nivel DEBUG se muestran también los mensajes por archivo.
+    :param archivo_metricas: Si se indica, las métricas se guardan al terminar el proceso (.prom o JSON);
+                             aunque se configure varias veces se guardan una sola vez, según la última configuración.
+    """
+    nivel = nivel or os.environ.get("CLASIFICADOR_LOG_NIVEL", "INFO")
+    formato = formato or os.environ.get("CLASIFICADOR_LOG_FORMATO", "texto")
+    if habilitar_metricas is None:
+        habilitar_metricas = os.environ.get("CLASIFICADOR_METRICAS", "0") == "1"
+
+    manejador = _ManejadorSalida()
+    manejador.setFormatter(_FormatoJSON() if formato == "json" else logging.Formatter("%(message)s"))
+    registro.handlers = [manejador]
+    registro.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+    registro.propagate = False
+    global _archivo_metricas, _guardado_registrado
+    archivo_metricas = archivo_metricas or os.environ.get("CLASIFICADOR_METRICAS_ARCHIVO")
+    metricas.habilitada = habilitar_metricas or bool(archivo_metricas)
+    if archivo_metricas and not _guardado_registrado:
+        atexit.register(_guardar_metricas_al_salir)
+        _guardado_registrado = True
+    _archivo_metricas = archivo_metricas
+
+
+configurar()
@@ -1,79 +1,88 @@
-import pandas as pd
 import numpy as np
 from sklearn.decomposition import PCA
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import cross_val_score
-import matplotlib.pyplot as plt
 import os
+import joblib
+from IndiceVecinos import construir_indice
+from SelectorParametros import SelectorParametros
+from Instrumentacion import metricas, registro
+from AlmacenCaracteristicas import AlmacenCaracteristicas
 
 class Knn:
-    def __init__(self, candidato_csv, k=5, usar_pca=True, excluir_parametros=None, pesos='distance', correlation_threshold=0.95):
+    # Cambiar este valor cuando cambie el contenido del modelo guardado
+    VERSION_MODELO = "3"
+
+    def __init__(self, candidato_csv, k=5, usar_pca=True, excluir_parametros=None, pesos='distance', correlation_threshold=0.95,
+                 indice="auto", recall_objetivo=1.0, seleccion="correlacion", n_parametros=10, sin_graficos=None,
+                 base_path=None):
         """
         Clase para implementar el modelo k-NN con exclusión automática de parámetros redundantes.
-        :param candidato_csv: Ruta al archivo CSV del audio candidato.
+        :param candidato_csv: Ruta al archivo CSV del audio candidato (se conserva por compatibilidad;
+                              los datos se leen de los almacenes binarios de `Parametros/`).
         :param k: Número de vecinos para k-NN.
         :param usar_pca: Si True, aplica PCA con 3 componentes.
         :param excluir_parametros: Lista de nombres de columnas a excluir antes de procesar.
         :param pesos: Método para asignar peso a los vecinos ('uniform' o 'distance').
         :param correlation_threshold: Umbral de correlación para excluir parámetros redundantes (por defecto 0.95).
+        :param indice: Índice de vecinos ('auto', 'fuerza_bruta', 'kd', 'ball' o 'ivf'; ver `IndiceVecinos`).
+        :param recall_objetivo: Recall mínimo aceptado; con valores menores a 1 se permite un índice aproximado.
+        :param seleccion: Estrategia de selección de parámetros ('correlacion', 'anova' o 'random_forest').
+        :param n_parametros: Número de parámetros a conservar con 'anova' y 'random_forest'.
+        :param sin_graficos: Si True, no se muestran gráficos ni se importa matplotlib (modo headless).
+                             None lo toma de la variable de entorno CLASIFICADOR_SIN_GRAFICOS ('1' para activarlo).
+        :param base_path: Carpeta que contiene `Parametros/` (por defecto la del proyecto).
         """
         # Rutas y configuración
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.base_datos_csv = os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros.csv")
-        self.candidato_csv = os.path.join(base_dir, "Parametros", "candidato_parametros.csv")
+        base_dir = base_path or os.path.dirname(os.path.abspath(__file__))
+        self.base_datos_almacen = AlmacenCaracteristicas(os.path.join(base_dir, "Parametros", "base_datos_aumentada_parametros"))
+        self.candidato_almacen = AlmacenCaracteristicas(os.path.join(base_dir, "Parametros", "candidato_parametros"))
         self.k = k
         self.usar_pca = usar_pca
         self.excluir_parametros = excluir_parametros if excluir_parametros else []
         self.scaler = StandardScaler()
         self.pesos = pesos
         self.correlation_threshold = correlation_threshold
-
-    def _seleccionar_parametros(self, data_frame):
+        self.indice = indice
+        self.recall_objetivo = recall_objetivo
+        self.seleccion = seleccion
+        self.n_parametros = n_parametros
+        if sin_graficos is None:
+            sin_graficos = os.environ.get("CLASIFICADOR_SIN_GRAFICOS", "0") == "1"
+        self.sin_graficos = sin_graficos
+        self.modelos_path = os.path.join(base_dir, "Parametros")
+        self.modelo = None
+
+    def _seleccionar_parametros(self):
         """
-        Identifica y excluye parámetros redundantes basados en la matriz de correlación.
-        :param data_frame: DataFrame con las características de la base de datos.
-        :return: Lista de nombres de columnas seleccionadas.
+        Ajusta la selección de parámetros sobre la base de datos aumentada (o reutiliza la guardada
+        en `Parametros/seleccion_parametros.json` si el almacén no cambió).
+        :return: Selector ajustado.
         """
-        # Calcular la matriz de correlación
-        correlacion = data_frame.corr().abs()
+        selector = SelectorParametros(self.seleccion, self.correlation_threshold, self.n_parametros)
+        selector.ajustar_almacen(self.base_datos_almacen, os.path.join(self.modelos_path, "seleccion_parametros.json"))
+        registro.debug(f"Parámetros seleccionados: {selector.columnas_seleccionadas}")
+        return selector
 
-        # Identificar columnas redundantes
-        columnas_redundantes = set()
-        for i in range(correlacion.shape[0]):
-            for j in range(i + 1, correlacion.shape[1]):
-                if correlacion.iloc[i, j] > self.correlation_threshold:
-                    columnas_redundantes.add(correlacion.columns[j])
-
-        # Excluir columnas redundantes
-        columnas_seleccionadas = [col for col in data_frame.columns if col not in columnas_redundantes]
-        print(f"Parámetros seleccionados: {columnas_seleccionadas}")
-        return columnas_seleccionadas
+    def _cargar_base_datos(self):
+        """
+        Carga la base de datos aumentada (memory-mapped, sin copias) y aplica la selección de parámetros.
+        """
+        self.base_datos_almacen.cargar()
+        self.selector = self._seleccionar_parametros()
+        self.columnas_seleccionadas = self.selector.columnas_seleccionadas
+        self.X = self.selector.transformar(self.base_datos_almacen.X)
+        self.y = self.base_datos_almacen.etiquetas
 
     def cargar_datos(self):
         """
         Carga los datos de la base de datos aumentada y del candidato,
-        excluyendo automáticamente parámetros redundantes según la matriz de correlación.
+        conservando los parámetros elegidos por la etapa de selección.
         """
-        # Cargar la base de datos aumentada
-        self.base_datos = pd.read_csv(self.base_datos_csv)
-        self.candidato = pd.read_csv(self.candidato_csv)
-
-        # Excluir columnas no numéricas o redundantes
-        columnas_numericas = self.base_datos.select_dtypes(include=[np.number]).columns.tolist()
-        columnas_a_usar = self._seleccionar_parametros(self.base_datos[columnas_numericas])
-        columnas_a_excluir = set(self.base_datos.columns) - set(columnas_a_usar) - {"Etiqueta"}
-
-        # Validar si las columnas a excluir existen antes de intentar eliminarlas
-        columnas_a_excluir = [col for col in columnas_a_excluir if col in self.base_datos.columns]
+        self._cargar_base_datos()
 
-        # Aplicar exclusión de parámetros
-        self.X = self.base_datos.drop(columns=columnas_a_excluir, errors="ignore").drop(columns=["Etiqueta"], errors="ignore").values
-        self.y = self.base_datos["Etiqueta"].values
-
-        # Validar si las columnas a excluir existen antes de intentar eliminarlas en el candidato
-        columnas_a_excluir_candidato = [col for col in columnas_a_excluir if col in self.candidato.columns]
-        self.candidato_X = self.candidato.drop(columns=columnas_a_excluir_candidato, errors="ignore").values
+        # Cargar el candidato con las mismas columnas que la base de datos
+        self.candidato_almacen.cargar()
+        self.candidato_X = self.selector.transformar(self.candidato_almacen.X, self.candidato_almacen.columnas)
 
         # Escalar las características
         self.X = self.scaler.fit_transform(self.X)
@@ -87,58 +96,231 @@ class Knn:
         self.X_pca = pca.fit_transform(self.X)
         self.candidato_X_pca = pca.transform(self.candidato_X)
 
-    def optimizar_k(self):
+    def optimizar_k(self, workers=1):
         """
-        Optimiza el valor de k utilizando validación cruzada.
+        Optimiza el valor de k utilizando validación cruzada (5 folds, como `cross_val_score`)
+        sobre los datos ya cargados, reutilizando la búsqueda de vecinos para todos los k.
+        :return: DataFrame con la precisión de cada k.
         """
-        k_valores = list(range(1, 21))
-        k_scores = []
+        from BarridoHiperparametros import BarridoHiperparametros
 
-        for k in k_valores:
-            knn = KNeighborsClassifier(n_neighbors=k, weights=self.pesos)
-            scores = cross_val_score(knn, self.X, self.y, cv=5, scoring="accuracy")
-            k_scores.append(scores.mean())
+        barrido = BarridoHiperparametros(
+            self.X, self.y, semilla=None, workers=workers, eta=None,
+            grilla={"k": list(range(1, 21)), "pesos": [self.pesos], "usar_pca": [False],
+                    "correlation_threshold": [None], "escalar": [False]},
+        )
+        resultados = barrido.ejecutar()
 
         # Determinar el mejor k
-        self.k = k_valores[np.argmax(k_scores)]
-        print(f"El valor óptimo de k es: {self.k}")
-
-        # Graficar los resultados
-        plt.plot(k_valores, k_scores)
-        plt.xlabel("Número de vecinos (k)")
-        plt.ylabel("Precisión promedio")
-        plt.title("Optimización de k con validación cruzada")
-        plt.show()
+        self.k = int(resultados.sort_values(["precision_media", "k"], ascending=[False, True]).iloc[0]["k"])
+        registro.info(f"El valor óptimo de k es: {self.k}")
+        return resultados.sort_values("k", ignore_index=True)
 
-    def clasificar(self):
+    @property
+    def modelo_path(self):
         """
-        Clasifica el audio candidato usando k-NN.
+        Ruta del modelo ajustado para la configuración actual (con o sin PCA).
         """
-        if self.usar_pca:
-            self.aplicar_pca()
-            X = self.X_pca
-            candidato_X = self.candidato_X_pca
+        sufijo = "pca" if self.usar_pca else "sin_pca"
+        return os.path.join(self.modelos_path, f"modelo_knn_{sufijo}.joblib")
+
+    def _configuracion(self):
+        configuracion = {
+            "k": self.k,
+            "usar_pca": self.usar_pca,
+            "pesos": self.pesos,
+            "indice": self.indice,
+            "recall_objetivo": self.recall_objetivo,
+            "seleccion": self.seleccion,
+        }
+        # Solo los parámetros que usa la estrategia de selección invalidan el modelo (como `SelectorParametros.firma`)
+        if self.seleccion == "correlacion":
+            configuracion["correlation_threshold"] = self.correlation_threshold
         else:
-            X = self.X
-            candidato_X = self.candidato_X
+            configuracion["n_parametros"] = self.n_parametros
+        return configuracion
 
-        # Entrenar el modelo k-NN con pesos
-        knn = KNeighborsClassifier(n_neighbors=self.k, weights=self.pesos)
-        knn.fit(X, self.y)
+    def ajustar(self, X, y, escalar=True):
+        """
+        Ajusta en memoria el escalador, el PCA y el índice de vecinos sobre una matriz ya seleccionada.
+        :param X: Matriz (N, d) de características de referencia.
+        :param y: Etiquetas de cada fila.
+        :param escalar: Si False, no se reescalan las características (se usan tal como vienen).
+        :return: Diccionario con el modelo ajustado (también queda en `self.modelo`).
+        """
+        scaler = None
+        if escalar:
+            scaler = self.scaler
+            X = scaler.fit_transform(X)
 
-        # Clasificar el candidato
-        prediccion = knn.predict(candidato_X)
-        print(f"El audio candidato fue clasificado como: {prediccion[0]}")
+        pca = None
+        if self.usar_pca:
+            pca = PCA(n_components=3)
+            X = pca.fit_transform(X)
+
+        y = np.asarray(y)
+        indice = construir_indice(X, self.indice, self.recall_objetivo)
+        metricas.observar("knn.construccion_indice", indice.tiempo_construccion)
+
+        self.modelo = {
+            "version": self.VERSION_MODELO,
+            "hash_almacen": None,
+            "configuracion": self._configuracion(),
+            "columnas": None,
+            "indices": None,
+            "scaler": scaler,
+            "pca": pca,
+            "indice_vecinos": indice,
+            "clases": np.unique(y),
+            "X_referencia": X,
+            "y": y,
+        }
+        return self.modelo
 
-        return prediccion[0]
+    def ajustar_modelo(self):
+        """
+        Ajusta una única vez la selección de parámetros, el escalador, el PCA y el índice de vecinos
+        sobre la base de datos aumentada, y guarda el modelo resultante en `modelo_path`.
+        """
+        self._cargar_base_datos()
+        self.ajustar(self.X, self.y)
+        self.modelo["hash_almacen"] = self.base_datos_almacen.hash
+        self.modelo["columnas"] = self.columnas_seleccionadas
+        self.modelo["indices"] = self.selector.indices
+        joblib.dump(self.modelo, self.modelo_path)
+        registro.info(f"Modelo k-NN ajustado y guardado en {self.modelo_path}")
+        return self.modelo
+
+    def _modelo_vigente(self, hash_actual):
+        """
+        Indica si el modelo en memoria corresponde a la versión, la configuración y el almacén actuales
+        (un modelo de `ajustar` no tiene hash de almacén, por lo que nunca lo es).
+        """
+        return (self.modelo is not None and self.modelo.get("version") == self.VERSION_MODELO
+                and self.modelo["hash_almacen"] == hash_actual
+                and self.modelo["configuracion"] == self._configuracion())
+
+    def cargar_modelo(self):
+        """
+        Carga el modelo guardado si corresponde a la base de datos y configuración actuales;
+        en caso contrario (almacén modificado, otra configuración o modelo inexistente) lo vuelve a ajustar.
+        """
+        hash_actual = self.base_datos_almacen.cargar().hash
+        if not self._modelo_vigente(hash_actual) and os.path.exists(self.modelo_path):
+            self.modelo = joblib.load(self.modelo_path)
 
+        if not self._modelo_vigente(hash_actual):
+            registro.info("El modelo guardado no existe o no corresponde a la base de datos actual; se ajusta nuevamente...")
+            metricas.contar("knn.modelos_reajustados")
+            return self.ajustar_modelo()
+        return self.modelo
+
+    def _transformar(self, X):
+        """
+        Aplica al lote de candidatos la misma selección, escalado y PCA que al modelo ajustado.
+        """
+        modelo = self.modelo
+        if modelo["indices"] is not None:
+            X = np.asarray(X)[:, modelo["indices"]]
+        if modelo["scaler"] is not None:
+            X = modelo["scaler"].transform(X)
+        if modelo["pca"] is not None:
+            X = modelo["pca"].transform(X)
+        return X
+
+    def _parametrizar_archivos(self, rutas):
+        """
+        Preprocesa y parametriza una lista de audios, devolviendo sus características escaladas.
+        """
+        from ProcesadorAudios import ProcesadorAudios
+        from Parametrizador import Parametrizador
+
+        procesador = ProcesadorAudios()
+        audios = np.stack([procesador._process_audio(ruta) for ruta in rutas]).astype(np.float32)
+        return Parametrizador().parametrizar_audios(audios, procesador.sampling_rate)
+
+    def _pesos_vecinos(self, distancias):
+        """
+        Pesos de cada vecino con las mismas reglas que `KNeighborsClassifier`
+        (con 'distance', un vecino a distancia 0 se lleva todo el voto).
+        """
+        if self.modelo["configuracion"]["pesos"] != "distance":
+            return np.ones_like(distancias)
+        with np.errstate(divide="ignore"):
+            pesos = 1.0 / distancias
+        infinitos = np.isinf(pesos)
+        filas_infinitas = np.any(infinitos, axis=1)
+        pesos[filas_infinitas] = infinitos[filas_infinitas]
+        return pesos
+
+    def clasificar_lote(self, candidatos, en_memoria=False):
+        """
+        Clasifica M candidatos con una única consulta vectorizada al índice de vecinos.
+        :param candidatos: Matriz (M, d) con las columnas del almacén de características
+                           (o las del `ajustar` en memoria), o lista de rutas de audio.
+        :param en_memoria: Si True, se usa tal cual el modelo ajustado con `ajustar` (evaluaciones);
+                           si False, se usa el modelo guardado, recargándolo o reajustándolo si el que está
+                           en memoria no corresponde a la configuración o al almacén actuales (ver `cargar_modelo`).
+        :return: Diccionario con "predicciones" (M,), "distancias" e "indices" de los vecinos (M, k),
+                 "clases" y "votos" (M, n_clases) con la proporción de voto de cada clase,
+                 y "tiempo_consulta_s" con la duración de la consulta al índice.
+        """
+        if not en_memoria:
+            self.cargar_modelo()
+        elif self.modelo is None:
+            raise ValueError("No hay un modelo ajustado en memoria: llama primero a `ajustar`.")
+        if len(candidatos) and isinstance(candidatos[0], str):
+            candidatos = self._parametrizar_archivos(candidatos)
+
+        X = self._transformar(np.atleast_2d(candidatos))
+        indice = self.modelo["indice_vecinos"]
+        distancias, indices = indice.consultar(X, self.modelo["configuracion"]["k"])
+        metricas.observar("knn.consulta", indice.tiempo_ultima_consulta)
+        metricas.contar("knn.candidatos_clasificados", len(X))
+
+        # Votación ponderada de los vecinos
+        clases = self.modelo["clases"]
+        etiquetas_vecinos = np.searchsorted(clases, self.modelo["y"])[indices]
+        votos = np.zeros((len(X), len(clases)))
+        np.add.at(votos, (np.arange(len(X))[:, None], etiquetas_vecinos), self._pesos_vecinos(distancias))
+        votos /= votos.sum(axis=1, keepdims=True)
+
+        return {
+            "predicciones": clases[np.argmax(votos, axis=1)],
+            "distancias": distancias,
+            "indices": indices,
+            "clases": clases,
+            "votos": votos,
+            "tiempo_consulta_s": indice.tiempo_ultima_consulta,
+        }
+
+    def clasificar_candidato(self):
+        """
+        Clasifica el candidato de `candidato_almacen` con el modelo ajustado (sin reajustar nada):
+        solo transforma el candidato y consulta el índice de vecinos.
+        """
+        self.cargar_modelo()
+        self.candidato_almacen.cargar()
+        columnas_modelo = self.base_datos_almacen.columnas
+        candidato = self.candidato_almacen.X[:, [self.candidato_almacen.columnas.index(col) for col in columnas_modelo]]
+        if self.modelo["pca"] is not None:
+            self.X_pca = self.modelo["X_referencia"]
+            self.candidato_X_pca = self._transformar(candidato)
+            self.y = self.modelo["y"]
+
+        prediccion = self.clasificar_lote(candidato)["predicciones"]
+        registro.info(f"El audio candidato fue clasificado como: {prediccion[0]}")
+        return prediccion[0]
 
     def visualizar_datos(self):
         """
-        Visualiza los datos en 3D si se usa PCA.
+        Visualiza los datos en 3D si se usa PCA (no hace nada en modo `sin_graficos`).
         """
+        if self.sin_graficos:
+            registro.info("Modo sin gráficos: se omite la visualización 3D.")
+            return
         if not self.usar_pca:
-            print("La visualización 3D solo está disponible con PCA habilitado.")
+            registro.warning("La visualización 3D solo está disponible con PCA habilitado.")
             return
 
         # Asegurar que se aplique PCA si no se ha hecho aún
@@ -147,7 +329,7 @@ class Knn:
 
         # Validar la consistencia de las dimensiones entre `self.y` y `self.X_pca`
         if len(self.y) != len(self.X_pca):
-            print(f"Error: Inconsistencia en dimensiones entre etiquetas ({len(self.y)}) y PCA ({len(self.X_pca)}).")
+            registro.error(f"Error: Inconsistencia en dimensiones entre etiquetas ({len(self.y)}) y PCA ({len(self.X_pca)}).")
             return
 
         # Colores para las etiquetas
@@ -159,6 +341,8 @@ class Knn:
             "desconocido": "gray"
         }
 
+        import matplotlib.pyplot as plt
+
         # Crear gráfico 3D
         fig = plt.figure()
         ax = fig.add_subplot(111, projection="3d")
@@ -185,48 +369,17 @@ class Knn:
         plt.show()
 
 
-    def optimizar_k(self):
-        """
-        Optimiza el valor de k utilizando validación cruzada.
-        """
-        k_valores = list(range(1, 21))
-        k_scores = []
-
-        for k in k_valores:
-            knn = KNeighborsClassifier(n_neighbors=k, weights=self.pesos)
-            scores = cross_val_score(knn, self.X, self.y, cv=5, scoring="accuracy")
-            k_scores.append(scores.mean())
-
-        # Determinar el mejor k
-        self.k = k_valores[np.argmax(k_scores)]
-        print(f"El valor óptimo de k es: {self.k}")
-
-        # Graficar los resultados
-        plt.plot(k_valores, k_scores)
-        plt.xlabel("Número de vecinos (k)")
-        plt.ylabel("Precisión promedio")
-        plt.title("Optimización de k con validación cruzada")
-        plt.show()
-
     def clasificar(self):
         """
-        Clasifica el audio candidato usando k-NN.
+        Clasifica el audio candidato usando k-NN, ajustando el PCA y el índice de vecinos sobre los datos cargados.
         """
-        # Usar PCA si está activado
+        # Usar PCA si está activado (para `visualizar_datos`; `ajustar` aplica el mismo PCA)
         if self.usar_pca:
             self.aplicar_pca()
-            X = self.X_pca
-            candidato_X = self.candidato_X_pca
-        else:
-            X = self.X
-            candidato_X = self.candidato_X
-
-        # Entrenar el modelo k-NN con pesos
-        knn = KNeighborsClassifier(n_neighbors=self.k, weights=self.pesos)
-        knn.fit(X, self.y)
 
-        # Clasificar el candidato
-        prediccion = knn.predict(candidato_X)
-        print(f"El audio candidato fue clasificado como: {prediccion[0]}")
+        # Ajustar el índice de vecinos sobre los datos ya escalados y clasificar el candidato
+        self.ajustar(self.X, self.y, escalar=False)
+        prediccion = self.clasificar_lote(self.candidato_X, en_memoria=True)["predicciones"]
+        registro.info(f"El audio candidato fue clasificado como: {prediccion[0]}")
 
         return prediccion[0]
@@ -1,13 +1,23 @@
 import os
-import pandas as pd
-import librosa
 import numpy as np
-from scipy.signal import butter, lfilter
 from sklearn.preprocessing import StandardScaler
+from ExtractorCaracteristicas import ExtractorCaracteristicas
+from CacheCaracteristicas import CacheCaracteristicas
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from CorpusAudios import CorpusAudios
+from DecodificadorAudios import DecodificadorAudios
+from Instrumentacion import metricas, registro
+from ProcesadorAudios import ProcesadorAudios
 
 class Parametrizador:
-    def __init__(self):
-        self.base_path = os.path.dirname(os.path.abspath(__file__))
+    def __init__(self, tamano_lote=32, usar_cache=True, exportar_csv=False, base_path=None):
+        """
+        :param tamano_lote: Cantidad de audios que se cargan y parametrizan juntos (acota la memoria usada).
+        :param usar_cache: Si True, reutiliza las características de archivos cuyo contenido no cambió.
+        :param exportar_csv: Si True, además del almacén binario se exportan los CSV de `Parametros/`.
+        :param base_path: Carpeta que contiene `DB/` y `Parametros/` (por defecto la del proyecto).
+        """
+        self.base_path = base_path or os.path.dirname(os.path.abspath(__file__))
         self.db_path = os.path.join(self.base_path, "DB")
         self.processed_path = os.path.join(self.db_path, "Processed")
         self.augmented_path = os.path.join(self.db_path, "Augmented")
@@ -15,100 +25,257 @@ class Parametrizador:
         self.candidato_path = os.path.join(self.db_path, "Candidato")
         os.makedirs(self.parametros_path, exist_ok=True)
         self.scaler = StandardScaler()
+        self.extractor = ExtractorCaracteristicas()
+        self.decodificador = DecodificadorAudios()
+        self.tamano_lote = tamano_lote
+        self.usar_cache = usar_cache
+        self.exportar_csv = exportar_csv
+        self.cache_path = os.path.join(self.parametros_path, "cache_caracteristicas.npz")
+        self.corpus_procesados = CorpusAudios(os.path.join(self.db_path, "corpus_procesados"))
+        self.corpus_aumentados = CorpusAudios(os.path.join(self.db_path, "corpus_aumentados"))
+        self.cache = None
 
-    def _band_pass_filter(self, data, sr, low, high):
+    def _extraer_caracteristicas(self, audio, sr):
         """
-        Aplica un filtro pasa banda al audio.
+        Extrae características como MFCCs, ZCR, espectro, y bandas de energía.
+        Todas se derivan de una única STFT por audio (ver `ExtractorCaracteristicas`).
         """
-        nyquist = 0.5 * sr
-        low = low / nyquist
-        high = high / nyquist
-        b, a = butter(4, [low, high], btype="band")
-        return lfilter(b, a, data)
+        return self.extractor.extraer(audio, sr)
 
-    def _extraer_caracteristicas(self, audio, sr):
+    def _obtener_etiqueta(self, file_name):
         """
-        Extrae características como MFCCs, ZCR, espectro, y bandas de energía.
+        Asigna una etiqueta según el nombre del archivo.
         """
-        # MFCCs
-        mfcc = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-        mfcc_mean = np.mean(mfcc, axis=1)
+        if "zanahoria" in file_name.lower():
+            return "zanahoria"
+        elif "papa" in file_name.lower():
+            return "papa"
+        elif "camote" in file_name.lower():
+            return "camote"
+        elif "berenjena" in file_name.lower():
+            return "berenjena"
+        else:
+            return "desconocido"
 
-        # Zero-Crossing Rate (ZCR)
-        zcr = np.mean(librosa.feature.zero_crossing_rate(y=audio))
+    def _extraer_lote(self, audios, sr):
+        """
+        Extrae las características de una matriz (N, muestras), registrando la duración y la cantidad de audios.
+        """
+        with metricas.medir("parametrizador.extraccion_lote"):
+            caracteristicas = self.extractor.extraer_lote(audios, sr)
+        metricas.contar("parametrizador.audios_parametrizados", len(audios))
+        return caracteristicas
+
+    def _extraer_caracteristicas_lote(self, folder_path, file_names):
+        """
+        Carga un lote de audios y extrae sus características.
+        Si todos tienen la misma longitud y frecuencia de muestreo (caso normal: 2 s a 16 kHz),
+        se apilan en una matriz (N, muestras) float32 y se parametrizan de una sola vez;
+        en caso contrario se procesan uno por uno.
+        :return: Lista con el vector de características de cada archivo, en el mismo orden.
+        """
+        with metricas.medir("parametrizador.decodificacion_lote"):
+            cargados = self.decodificador.cargar_varios([os.path.join(folder_path, file_name) for file_name in file_names])
+        metricas.contar("parametrizador.archivos_decodificados", len(cargados))
+        metricas.contar("parametrizador.bytes_decodificados", sum(audio.nbytes for audio, _ in cargados))
+        frecuencias = {sr for _, sr in cargados}
+        longitudes = {len(audio) for audio, _ in cargados}
 
-        # Centroide Espectral y Ancho Espectral
-        spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))
-        spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=audio, sr=sr))
+        if len(frecuencias) == 1 and len(longitudes) == 1:
+            matriz = np.stack([audio for audio, _ in cargados]).astype(np.float32, copy=False)
+            return list(self._extraer_lote(matriz, frecuencias.pop()))
 
-        # Energía en Bandas Específicas
-        bands = [(300, 800), (800, 1600), (1600, 3400)]
-        energies = []
-        for low, high in bands:
-            filtered_audio = self._band_pass_filter(audio, sr=sr, low=low, high=high)
-            energies.append(np.sum(filtered_audio ** 2))
+        registro.warning("Advertencia: los audios del lote tienen distinta duración o frecuencia de muestreo; se procesan por separado.")
+        return [self._extraer_caracteristicas(audio, sr) for audio, sr in cargados]
 
-        # Consolidar Características
-        features = list(mfcc_mean) + [zcr, spectral_centroid, spectral_bandwidth] + energies
-        return features
+    def _registrar_cache(self, origen):
+        metricas.contar("parametrizador.cache_aciertos", self.cache.aciertos)
+        metricas.contar("parametrizador.cache_fallos", self.cache.fallos)
+        registro.info(f"Cache de características en {origen}: {self.cache.aciertos} aciertos, {self.cache.fallos} fallos.",
+                      extra={"campos": {"origen": origen, "aciertos": self.cache.aciertos, "fallos": self.cache.fallos}})
 
-    def _procesar_y_guardar(self, folder_path, output_file):
+    def _obtener_caracteristicas(self, folder_path, archivos):
         """
-        Procesa todos los audios en una carpeta, extrae sus características, 
-        les asigna etiquetas y las guarda en un CSV.
-        """
-        registros = []
-        for file_name in os.listdir(folder_path):
-            if file_name.endswith(".wav"):
-                file_path = os.path.join(folder_path, file_name)
-                audio, sr = librosa.load(file_path, sr=None)
-                caracteristicas = self._extraer_caracteristicas(audio, sr)
-                
-                # Asignar etiquetas según nombres de archivos
-                if "zanahoria" in file_name.lower():
-                    etiqueta = "zanahoria"
-                elif "papa" in file_name.lower():
-                    etiqueta = "papa"
-                elif "camote" in file_name.lower():
-                    etiqueta = "camote"
-                elif "berenjena" in file_name.lower():
-                    etiqueta = "berenjena"
+        Obtiene las características (sin escalar) de los archivos indicados. Con la cache activa,
+        solo se extraen los archivos nuevos o modificados; el resto se toma de la cache.
+        :return: Diccionario {nombre de archivo: vector de características}.
+        """
+        resultado = {}
+        pendientes = archivos
+        claves = {}
+
+        if self.usar_cache:
+            if self.cache is None:
+                self.cache = CacheCaracteristicas(self.cache_path, self.extractor.firma)
+            self.cache.reiniciar_contadores()
+            pendientes = []
+            for file_name in archivos:
+                claves[file_name] = CacheCaracteristicas.hash_archivo(os.path.join(folder_path, file_name))
+                caracteristicas = self.cache.obtener(claves[file_name])
+                if caracteristicas is None:
+                    pendientes.append(file_name)
                 else:
-                    etiqueta = "desconocido"
+                    resultado[file_name] = caracteristicas
+            self._registrar_cache(folder_path)
+
+        for inicio in range(0, len(pendientes), self.tamano_lote):
+            lote = pendientes[inicio:inicio + self.tamano_lote]
+            for file_name, caracteristicas in zip(lote, self._extraer_caracteristicas_lote(folder_path, lote)):
+                resultado[file_name] = caracteristicas
+                if self.usar_cache:
+                    self.cache.agregar(claves[file_name], caracteristicas)
+        return resultado
 
-                # Agregar información al registro
-                caracteristicas.append(file_name)
-                caracteristicas.append(etiqueta)
-                registros.append(caracteristicas)
+    def _obtener_caracteristicas_corpus(self, corpus):
+        """
+        Igual que `_obtener_caracteristicas`, pero leyendo lotes (vistas sin copia) de un corpus empaquetado.
+        La cache usa como clave el hash del archivo fuente guardado en el índice del corpus.
+        :return: Matriz (N, d) de características, en el orden del corpus.
+        """
+        X = np.empty((len(corpus), len(self.extractor.columnas)))
+        pendientes = np.ones(len(corpus), dtype=bool)
+        claves = corpus.hashes
 
-        # Crear DataFrame y Escalar Características
-        columnas = (
-            [f"MFCC_{i}" for i in range(1, 14)]
-            + ["ZCR", "CentroideEspectral", "AnchoEspectral", "EnergiaBanda_1", "EnergiaBanda_2", "EnergiaBanda_3", "Archivo", "Etiqueta"]
-        )
-        df = pd.DataFrame(registros, columns=columnas)
+        if self.usar_cache:
+            if self.cache is None:
+                self.cache = CacheCaracteristicas(self.cache_path, self.extractor.firma)
+            self.cache.reiniciar_contadores()
+            for i, clave in enumerate(claves):
+                caracteristicas = self.cache.obtener(clave)
+                if caracteristicas is not None:
+                    X[i] = caracteristicas
+                    pendientes[i] = False
+            self._registrar_cache(corpus.ruta)
 
-        # Escalar Características Numéricas (Excluyendo "Archivo" y "Etiqueta")
-        caracteristicas_num = df.drop(columns=["Archivo", "Etiqueta"])
-        df_scaled = pd.DataFrame(self.scaler.fit_transform(caracteristicas_num), columns=caracteristicas_num.columns)
-        df_scaled["Archivo"] = df["Archivo"]
-        df_scaled["Etiqueta"] = df["Etiqueta"]
+        indices = np.flatnonzero(pendientes)
+        for inicio in range(0, len(indices), self.tamano_lote):
+            lote = indices[inicio:inicio + self.tamano_lote]
+            # Con la cache vacía los lotes son contiguos y se leen como una vista del corpus
+            audios = corpus[lote[0]:lote[-1] + 1] if lote[-1] - lote[0] + 1 == len(lote) else corpus[lote]
+            X[lote] = self._extraer_lote(audios, corpus.sr)
+            if self.usar_cache:
+                for i in lote:
+                    self.cache.agregar(claves[i], X[i])
+        return X
 
-        # Guardar Características en CSV
-        output_path = os.path.join(self.parametros_path, output_file)
-        df_scaled.to_csv(output_path, index=False)
-        print(f"Características guardadas en {output_path}")
+    def _procesar_corpus(self, corpus, folder_path, output_name):
+        """
+        Empaqueta (de forma incremental) los audios de una carpeta en un corpus y guarda sus características.
+        """
+        corpus.empaquetar(folder_path, self._obtener_etiqueta)
+        self._guardar_almacen(self._obtener_caracteristicas_corpus(corpus), corpus.archivos, output_name)
+
+    def _procesar_y_guardar(self, folder_path, output_name):
+        """
+        Procesa todos los audios en una carpeta, extrae sus características, 
+        les asigna etiquetas y las guarda en un almacén binario (y opcionalmente en un CSV).
+        """
+        # Mismo orden de filas que el corpus (ver `CorpusAudios.empaquetar`)
+        archivos = sorted(file_name for file_name in os.listdir(folder_path) if file_name.endswith(".wav"))
+        caracteristicas_archivos = self._obtener_caracteristicas(folder_path, archivos)
+        X = np.array([caracteristicas_archivos[file_name] for file_name in archivos], dtype=np.float64)
+        self._guardar_almacen(X, archivos, output_name)
 
-    def procesar_base_datos(self):
+    def _guardar_almacen(self, X, archivos, output_name):
         """
-        Procesa los audios de la base de datos (procesados y aumentados) y guarda sus características en un CSV.
+        Escala las características, asigna las etiquetas y las guarda en un almacén binario (y opcionalmente en un CSV).
         """
-        self._procesar_y_guardar(self.processed_path, "base_datos_parametros.csv")
-        self._procesar_y_guardar(self.augmented_path, "base_datos_aumentada_parametros.csv")
+        etiquetas = [self._obtener_etiqueta(file_name) for file_name in archivos]
+
+        # Escalar Características Numéricas
+        X_scaled = self.scaler.fit_transform(X)
+
+        # Guardar Características
+        almacen = AlmacenCaracteristicas(os.path.join(self.parametros_path, output_name))
+        almacen.guardar(X_scaled, self.extractor.columnas, archivos, etiquetas,
+                        scaler=self.scaler, extractor=self.extractor)
+        registro.info(f"Características guardadas en {almacen.ruta_matriz}")
+        if self.exportar_csv:
+            almacen.exportar_csv(os.path.join(self.parametros_path, f"{output_name}.csv"))
+
+    def procesar_base_datos(self, usar_corpus=False):
+        """
+        Procesa los audios de la base de datos (procesados y aumentados) y guarda sus características.
+        :param usar_corpus: Si True, los audios se empaquetan en `DB/corpus_procesados` y `DB/corpus_aumentados`
+                            (solo se decodifican los archivos nuevos o modificados) y se leen desde ahí.
+                            Los almacenes son los mismos que sin corpus, salvo que el corpus omite (con una
+                            advertencia) los WAV que no son mono de `target_duration` segundos a 16 kHz.
+        """
+        if usar_corpus:
+            self._procesar_corpus(self.corpus_procesados, self.processed_path, "base_datos_parametros")
+            self._procesar_corpus(self.corpus_aumentados, self.augmented_path, "base_datos_aumentada_parametros")
+        else:
+            self._procesar_y_guardar(self.processed_path, "base_datos_parametros")
+            self._procesar_y_guardar(self.augmented_path, "base_datos_aumentada_parametros")
+
+        if self.cache is not None:
+            # Se descartan las entradas de archivos que ya no existen o cambiaron
+            self.cache.guardar(podar=True)
+
+    def procesar_flujo(self, aumentaciones, sr):
+        """
+        Extrae las características de la base de datos directamente desde el generador de
+        `ProcesadorAudios.generar_aumentaciones`, sin leer `Processed` ni `Augmented` del disco,
+        y guarda los mismos almacenes que `procesar_base_datos`.
+        :param aumentaciones: Iterable de tuplas (archivo fuente, aug_id, audio); aug_id 0 es el audio procesado.
+        :param sr: Frecuencia de muestreo de los audios.
+        """
+        grupos = {"base_datos_parametros": ([], []), "base_datos_aumentada_parametros": ([], [])}
+        lote = []
+
+        def vaciar_lote():
+            caracteristicas = self._extraer_lote(np.stack([audio for _, _, audio in lote]).astype(np.float32), sr)
+            for (file_name, aug_id, _), fila in zip(lote, caracteristicas):
+                archivos, filas = grupos["base_datos_parametros" if aug_id == 0 else "base_datos_aumentada_parametros"]
+                archivos.append(ProcesadorAudios.nombre_archivo(file_name, aug_id))
+                filas.append(fila)
+            lote.clear()
+
+        for file_name, aug_id, audio in aumentaciones:
+            lote.append((file_name, aug_id, audio))
+            if len(lote) == self.tamano_lote:
+                vaciar_lote()
+        if lote:
+            vaciar_lote()
+
+        for output_name, (archivos, filas) in grupos.items():
+            self._guardar_almacen(np.array(filas, dtype=np.float64), archivos, output_name)
+
+    def _cargar_escalador(self):
+        """
+        Si el escalador no está ajustado, recupera el escalado de la base de datos aumentada
+        desde los metadatos de su almacén. Los almacenes migrados desde CSV no guardan el escalador:
+        en ese caso se ajusta sobre la matriz del almacén, como se hacía con el CSV.
+        """
+        if hasattr(self.scaler, "mean_"):
+            return
+        base_datos_aumentada = AlmacenCaracteristicas(os.path.join(self.parametros_path, "base_datos_aumentada_parametros"))
+        registro.info("Recuperando el escalador de la base de datos aumentada...")
+        try:
+            metadatos = base_datos_aumentada.cargar().metadatos  # migra el CSV si el almacén no existe
+        except FileNotFoundError:
+            raise FileNotFoundError(f"La base de datos aumentada no se encontró en {base_datos_aumentada.ruta}.")
+        if metadatos["media"] is None or metadatos["escala"] is None:
+            self.scaler.fit(np.asarray(base_datos_aumentada.X, dtype=np.float64))
+            return
+        self.scaler.mean_ = np.array(metadatos["media"])
+        self.scaler.scale_ = np.array(metadatos["escala"])
+        self.scaler.var_ = self.scaler.scale_ ** 2
+        self.scaler.n_features_in_ = len(self.scaler.mean_)
+
+    def parametrizar_audios(self, audios, sr):
+        """
+        Extrae las características de audios ya procesados y les aplica el escalado de la base de datos aumentada.
+        :param audios: Matriz (N, muestras) con un audio procesado por fila.
+        :param sr: Frecuencia de muestreo de los audios.
+        :return: Matriz (N, d) de características escaladas, con las columnas de `extractor.columnas`.
+        """
+        self._cargar_escalador()
+        return self.scaler.transform(self._extraer_lote(audios, sr))
 
     def procesar_audio_candidato(self):
         """
-        Procesa únicamente el archivo `candidato_procesado.wav` y guarda sus características en un CSV,
+        Procesa únicamente el archivo `candidato_procesado.wav` y guarda sus características,
         aplicando el mismo escalado utilizado para la base de datos aumentada.
         """
         # Ruta del archivo esperado
@@ -120,39 +287,27 @@ class Parametrizador:
             raise FileNotFoundError(f"El archivo {candidato_file} no se encontró en la carpeta {self.candidato_path}.")
 
         # Procesar el archivo
-        registros = []
-        audio, sr = librosa.load(candidato_path, sr=None)
-        caracteristicas = self._extraer_caracteristicas(audio, sr)
-        caracteristicas.append(candidato_file)
-        registros.append(caracteristicas)
-
-        # Crear DataFrame
-        columnas = [f"MFCC_{i}" for i in range(1, 14)] + ["ZCR", "CentroideEspectral", "AnchoEspectral",
-                                                        "EnergiaBanda_1", "EnergiaBanda_2", "EnergiaBanda_3", "Archivo"]
-        df = pd.DataFrame(registros, columns=columnas)
-
-        # Verificar si el escalador está ajustado con la base de datos aumentada
-        base_datos_aumentada_path = os.path.join(self.parametros_path, "base_datos_aumentada_parametros.csv")
-        if not hasattr(self.scaler, "mean_"):
-            print("Ajustando el escalador con los datos de la base de datos aumentada...")
-            if not os.path.exists(base_datos_aumentada_path):
-                raise FileNotFoundError(f"La base de datos aumentada no se encontró en {base_datos_aumentada_path}.")
-            base_datos_aumentada = pd.read_csv(base_datos_aumentada_path)
-            caracteristicas_base = base_datos_aumentada.drop(columns=["Archivo", "Etiqueta"])
-            self.scaler.fit(caracteristicas_base)
+        audio, sr = self.decodificador.cargar(candidato_path)
+        caracteristicas = np.array([self._extraer_caracteristicas(audio, sr)])
+
+        self._cargar_escalador()
 
         # **Escalar Características del Audio Candidato**
-        caracteristicas_num = df.drop(columns=["Archivo"])
         try:
-            df_scaled = pd.DataFrame(self.scaler.transform(caracteristicas_num), columns=caracteristicas_num.columns)
+            caracteristicas_scaled = self.scaler.transform(caracteristicas)
         except ValueError as e:
-            print(f"Error al normalizar las características: {e}")
+            registro.error(f"Error al normalizar las características: {e}")
             raise
 
-        # Agregar la columna del archivo al DataFrame escalado
-        df_scaled["Archivo"] = df["Archivo"]
+        self.guardar_candidato(caracteristicas_scaled, candidato_file)
 
-        # Guardar Características en CSV (sobrescribir siempre)
-        output_path = os.path.join(self.parametros_path, "candidato_parametros.csv")
-        df_scaled.to_csv(output_path, index=False)
-        print(f"Características del audio candidato normalizadas y guardadas en {output_path}")
+    def guardar_candidato(self, caracteristicas_scaled, candidato_file="candidato_procesado.wav"):
+        """
+        Guarda (sobrescribiendo siempre) las características escaladas del candidato en `candidato_parametros`.
+        """
+        almacen = AlmacenCaracteristicas(os.path.join(self.parametros_path, "candidato_parametros"))
+        almacen.guardar(caracteristicas_scaled, self.extractor.columnas, [candidato_file],
+                        scaler=self.scaler, extractor=self.extractor)
+        registro.info(f"Características del audio candidato normalizadas y guardadas en {almacen.ruta_matriz}")
+        if self.exportar_csv:
+            almacen.exportar_csv(os.path.join(self.parametros_path, "candidato_parametros.csv"))
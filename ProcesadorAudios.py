@@ -2,12 +2,30 @@ import os
 import librosa
 import numpy as np
 import shutil
+import zlib
 import soundfile as sf
-from scipy.signal import butter, lfilter
+from scipy.signal import butter, sosfilt
+from concurrent.futures import ProcessPoolExecutor
+from AumentadorAudios import AumentadorAudios
+from DecodificadorAudios import DecodificadorAudios
+from Instrumentacion import metricas, registro, reiniciar_rss_pico, rss_actual_mb, rss_pico_mb
 
 class ProcesadorAudios:
-    def __init__(self):
-            self.base_path = os.path.dirname(os.path.abspath(__file__))
+    def __init__(self, aumentaciones=None, calidad_remuestreo="alta", limite_memoria_mb=None, tamano_bloque=None,
+                 base_path=None):
+            """
+            :param aumentaciones: Lista de augmentaciones a aplicar (ver `AumentadorAudios`);
+                                  None usa las de siempre (tono ±2, ruido y velocidad 0.9 / 1.1).
+            :param calidad_remuestreo: Calidad del remuestreo al decodificar ('alta', 'media' o 'rapida';
+                                       ver `DecodificadorAudios`).
+            :param limite_memoria_mb: Si se indica, los audios se preprocesan en modo de memoria acotada
+                                      (float32, por bloques y con buffers reutilizados) sin que el pico de
+                                      memoria residente del proceso supere este límite (ver `_process_audio_acotado`).
+                                      None lo toma de la variable de entorno CLASIFICADOR_LIMITE_MEMORIA_MB (si existe).
+            :param tamano_bloque: Muestras por bloque en el modo acotado; None lo deriva del límite de memoria.
+            :param base_path: Carpeta que contiene `DB/` (por defecto la del proyecto).
+            """
+            self.base_path = base_path or os.path.dirname(os.path.abspath(__file__))
             self.db_path = os.path.join(self.base_path, "DB")
             self.crudos_path = os.path.join(self.db_path, "Crudos")
             self.processed_path = os.path.join(self.db_path, "Processed")
@@ -15,18 +33,57 @@ class ProcesadorAudios:
             self.candidato_path = os.path.join(self.db_path, "Candidato")  # Definir la ruta del candidato
             self.sampling_rate = 16000
             self.target_duration = 2.0
+            self.semilla = 0  # Semilla base para que la augmentación sea reproducible
+            self.aumentador = AumentadorAudios(aumentaciones)
+            self.decodificador = DecodificadorAudios(calidad_remuestreo)
+            if limite_memoria_mb is None and os.environ.get("CLASIFICADOR_LIMITE_MEMORIA_MB"):
+                limite_memoria_mb = float(os.environ["CLASIFICADOR_LIMITE_MEMORIA_MB"])
+            self.limite_memoria_mb = limite_memoria_mb
+            self.tamano_bloque = tamano_bloque
+            self.rss_pico_archivo_mb = None  # Pico de memoria del último archivo procesado en modo acotado
+            self._sos = {}
+            self._buffers = {}
 
             os.makedirs(self.processed_path, exist_ok=True)
             os.makedirs(self.augmented_path, exist_ok=True)
             os.makedirs(self.candidato_path, exist_ok=True)  # Crear carpeta de candidato si no existe
 
 
-    def _butter_bandpass_filter(self, data, lowcut=300.0, highcut=3400.0, fs=16000, order=5):
+    def _butter_bandpass_filter(self, data, lowcut=300.0, highcut=3400.0, fs=16000, order=5, axis=-1):
+            """
+            Pasabanda Butterworth en secciones de segundo orden, con el diseño cacheado (ver `_sos_pasabanda`).
+            :param data: Señal 1D o lote de señales; se filtra a lo largo de `axis`.
+            """
+            return sosfilt(self._sos_pasabanda(fs, lowcut, highcut, order), data, axis=axis)
+
+    def __getstate__(self):
+        # Los buffers de trabajo no se envían a los procesos del pool: cada uno asigna los suyos
+        estado = self.__dict__.copy()
+        estado["_buffers"] = {}
+        return estado
+
+    def _sos_pasabanda(self, fs, lowcut=300.0, highcut=3400.0, order=5, dtype=np.float64):
+        """
+        Coeficientes SOS del pasabanda, diseñados una sola vez por combinación de parámetros.
+        Las secciones de segundo orden son más estables que la forma (b, a) de orden 10, que en float32
+        pierde demasiada precisión.
+        """
+        clave = (fs, lowcut, highcut, order, np.dtype(dtype).str)
+        if clave not in self._sos:
             nyquist = 0.5 * fs
-            low = lowcut / nyquist
-            high = highcut / nyquist
-            b, a = butter(order, [low, high], btype='band')
-            return lfilter(b, a, data)
+            sos = butter(order, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos')
+            self._sos[clave] = sos.astype(dtype)
+        return self._sos[clave]
+
+    def _buffer(self, nombre, forma):
+        """
+        Buffer de trabajo float32 reutilizado entre bloques y archivos; solo se reasigna si hace falta uno mayor.
+        """
+        tamano = int(np.prod(forma))
+        buffer = self._buffers.get(nombre)
+        if buffer is None or buffer.size < tamano:
+            buffer = self._buffers[nombre] = np.empty(tamano, dtype=np.float32)
+        return buffer[:tamano].reshape(forma)
 
     def _normalize_audio(self, audio):
         return audio / np.max(np.abs(audio))
@@ -34,7 +91,7 @@ class ProcesadorAudios:
     def _remove_silence(self, audio, sr, threshold_db=-25):
             intervals = librosa.effects.split(audio, top_db=threshold_db)
             if len(intervals) == 0:
-                print("Advertencia: No se detectaron intervalos de audio que superen el umbral de silencio.")
+                registro.warning("Advertencia: No se detectaron intervalos de audio que superen el umbral de silencio.")
                 return audio
             return np.concatenate([audio[start:end] for start, end in intervals])
 
@@ -45,58 +102,368 @@ class ProcesadorAudios:
         else:
             return np.pad(audio, (0, target_length - len(audio)))
         
-    def _augment_audio(self, audio, sr):
+    def _semilla_archivo(self, file_name):
+        """
+        Deriva una semilla determinística para un archivo a partir de su nombre y de `self.semilla`,
+        de modo que el ruido agregado no dependa del orden ni del proceso que lo genere.
+        """
+        return (self.semilla, zlib.crc32(file_name.encode("utf-8")))
+
+    def _augment_audio(self, audio, sr, rng=None):
         """
-        Realiza augmentación del audio original con las siguientes técnicas:
-        - Cambio de tono (pitch shift)
-        - Agregar ruido blanco
-        - Cambiar velocidad ajustando la duración manualmente
+        Realiza augmentación del audio original con las técnicas configuradas en `self.aumentador`
+        (por defecto: cambio de tono, ruido blanco y cambio de velocidad ajustando la duración),
+        a partir de una única STFT del audio.
+        :param rng: Generador `np.random.Generator` para el ruido (si es None se usa uno sin semilla).
         """
-        augmented_audios = []
+        if rng is None:
+            rng = np.random.default_rng()
+        with metricas.medir("procesador.augmentacion"):
+            return self.aumentador.aumentar(audio, sr, rng, ajustar_duracion=self._adjust_duration)
 
-        # Cambio de tono
-        for n_steps in [-2, 2]:  # Dos tonos arriba y abajo
-            augmented_audios.append(librosa.effects.pitch_shift(y=audio, sr=sr, n_steps=n_steps))
 
-        # Agregar ruido
-        noise = np.random.normal(0, 0.01, len(audio))
-        augmented_audios.append(audio + noise)
+    def _process_signal(self, audio, sr):
+        with metricas.medir("procesador.filtro"):
+            audio = self._butter_bandpass_filter(audio, fs=sr)
+        with metricas.medir("procesador.silencio"):
+            audio = self._remove_silence(audio, sr)
+        audio = self._normalize_audio(audio)
+        audio = self._adjust_duration(audio)
+        return audio
 
-        # Cambiar velocidad ajustando la duración manualmente
-        for rate in [0.9, 1.1]:  # Más lento y más rápido
-            # Aplicar `time_stretch` con el argumento `rate` explícito
-            stretched_audio = librosa.effects.time_stretch(audio, rate=rate)
-            adjusted_audio = self._adjust_duration(stretched_audio)
-            augmented_audios.append(adjusted_audio)
+    def _fuente_archivo(self, file_path):
+        """
+        Fuente de bloques para el modo acotado: tupla (sr, muestras, función tamano_bloque -> generador de bloques
+        mono float32 a la frecuencia del archivo). Los formatos que soundfile no abre se decodifican completos.
+        """
+        try:
+            info = sf.info(file_path)
+        except RuntimeError:
+            audio, sr = self.decodificador.cargar(file_path)
+            return self._fuente_senal(audio, sr)
 
-        return augmented_audios
+        def bloques(tamano_bloque):
+            with sf.SoundFile(file_path) as archivo:
+                lectura = self._buffer("lectura", (tamano_bloque, archivo.channels))
+                while True:
+                    leidos = archivo.read(out=lectura)
+                    if len(leidos) == 0:
+                        return
+                    if archivo.channels == 1:
+                        yield leidos[:, 0]
+                    else:
+                        yield np.mean(leidos, axis=1, out=self._buffer("mono", (len(leidos),)))
 
+        return info.samplerate, info.frames, bloques
 
-    def _process_audio(self, file_path):
-        audio, sr = librosa.load(file_path, sr=self.sampling_rate)
-        audio = self._butter_bandpass_filter(audio, fs=sr)
-        audio = self._remove_silence(audio, sr)
-        audio = self._normalize_audio(audio)
-        audio = self._adjust_duration(audio)
+    @staticmethod
+    def _fuente_senal(audio, sr):
+        audio = np.asarray(audio, dtype=np.float32)
+        return sr, len(audio), lambda tamano_bloque: (audio[i:i + tamano_bloque] for i in range(0, len(audio), tamano_bloque))
+
+    def _bloques_filtrados(self, fuente, tamano_bloque):
+        """
+        Remuestrea y filtra por bloques, conservando el estado del remuestreador y del filtro entre bloques
+        (mismo resultado que procesar la señal completa). Genera exactamente ceil(n * sampling_rate / sr) muestras.
+        """
+        sr, n_origen, bloques = fuente
+        n = int(np.ceil(n_origen * self.sampling_rate / sr))
+        remuestreador = self.decodificador._remuestreador(sr, self.sampling_rate) if sr != self.sampling_rate else None
+        sos = self._sos_pasabanda(self.sampling_rate, dtype=np.float32)
+        zi = np.zeros((sos.shape[0], 2), dtype=np.float32)
+        emitidas = 0
+
+        def piezas():
+            for bloque in bloques(tamano_bloque):
+                yield remuestreador.resample_chunk(bloque, last=False) if remuestreador is not None else bloque
+            if remuestreador is not None:
+                yield remuestreador.resample_chunk(np.empty(0, dtype=np.float32), last=True)
+            yield np.zeros(max(n - emitidas, 0), dtype=np.float32)  # relleno final, como `librosa.resample`
+
+        for pieza in piezas():
+            pieza = pieza[:n - emitidas]
+            if len(pieza) == 0:
+                continue
+            filtrado, zi = sosfilt(sos, pieza, zi=zi)
+            emitidas += len(pieza)
+            yield filtrado
+
+    @staticmethod
+    def _intervalos_no_silenciosos(energia, n, top_db, frame_length=2048, hop_length=512):
+        """
+        Intervalos (en muestras) de `librosa.effects.split` a partir de la suma de cuadrados de cada bloque
+        de `hop_length` muestras, sin tener la señal completa en memoria.
+        """
+        n_frames = 1 + n // hop_length
+        bloques_por_frame = frame_length // hop_length
+        relleno = bloques_por_frame // 2
+        energia = np.pad(energia, (relleno, bloques_por_frame))
+        mse = np.convolve(energia, np.ones(bloques_por_frame), mode="valid")[:n_frames] / frame_length
+        db = 10.0 * np.log10(np.maximum(1e-10, mse)) - 10.0 * np.log10(np.maximum(1e-10, mse.max()))
+        no_silencio = db > -top_db
+
+        bordes = [np.flatnonzero(np.diff(no_silencio.astype(int))) + 1]
+        if no_silencio[0]:
+            bordes.insert(0, [0])
+        if no_silencio[-1]:
+            bordes.append([len(no_silencio)])
+        bordes = np.minimum(np.concatenate(bordes).astype(int) * hop_length, n)
+        return bordes.reshape((-1, 2))
+
+    @staticmethod
+    def _copiar_intervalos(bloque, inicio, intervalos, salida, llenas):
+        """
+        Copia a `salida` (a partir de la posición `llenas`) las muestras del bloque que caen dentro de los intervalos.
+        :return: Nueva cantidad de posiciones llenas de `salida`.
+        """
+        for comienzo, fin in intervalos:
+            desde, hasta = max(comienzo, inicio), min(fin, inicio + len(bloque))
+            if desde >= hasta:
+                continue
+            cantidad = min(hasta - desde, len(salida) - llenas)
+            salida[llenas:llenas + cantidad] = bloque[desde - inicio:desde - inicio + cantidad]
+            llenas += cantidad
+            if llenas == len(salida):
+                break
+        return llenas
+
+    def _process_audio_acotado(self, fuente, threshold_db=-25, hop_length=512):
+        """
+        Preprocesamiento con memoria acotada, equivalente a `_process_signal` pero en float32 y sin materializar
+        la señal completa cuando no entra en el presupuesto:
+        1) se decodifica, remuestrea y filtra por bloques, acumulando por cada `hop_length` muestras su energía
+           (para la detección de silencios de `_remove_silence`) y su pico (para la normalización);
+        2) se copian a la salida solo las primeras `target_duration` segundos no silenciosos, desde la señal
+           filtrada guardada si entraba en el presupuesto o repitiendo el paso 1 hasta completar la salida.
+        :param fuente: Tupla de `_fuente_archivo` / `_fuente_senal`.
+        :return: Audio procesado float32 de `target_duration` segundos.
+        """
+        sr, n_origen, _ = fuente
+        n = int(np.ceil(n_origen * self.sampling_rate / sr))
+        disponible = (self.limite_memoria_mb - (rss_actual_mb() or 0.0)) * 1024 * 1024
+        if disponible <= 0:
+            raise MemoryError(f"El proceso ya usa más memoria que el límite de {self.limite_memoria_mb} MB.")
+        # Los buffers de un bloque (lectura, mono, remuestreado, filtrado, estadísticas) ocupan ~1/8 de lo disponible
+        tamano_bloque = self.tamano_bloque or int(np.clip(disponible // 8 // 32, 4096, 1 << 20))
+        senal = self._buffer("senal", (n,)) if n * 4 <= disponible // 2 else None
+
+        energia, picos = [], []
+        resto = np.empty(0, dtype=np.float32)
+        posicion = 0
+        for filtrado in self._bloques_filtrados(fuente, tamano_bloque):
+            if senal is not None:
+                senal[posicion:posicion + len(filtrado)] = filtrado
+            posicion += len(filtrado)
+            x = np.concatenate([resto, filtrado]) if len(resto) else filtrado
+            completas = len(x) // hop_length * hop_length
+            por_hop = x[:completas].reshape(-1, hop_length)
+            energia.append(np.einsum("ij,ij->i", por_hop, por_hop, dtype=np.float64))
+            picos.append(np.abs(por_hop).max(axis=1, initial=0.0))
+            resto = x[completas:].copy()
+        if len(resto):
+            energia.append([np.dot(resto.astype(np.float64), resto)])
+            picos.append([np.abs(resto).max()])
+        energia, picos = np.concatenate(energia), np.concatenate(picos)
+
+        intervalos = self._intervalos_no_silenciosos(energia, n, threshold_db, hop_length=hop_length)
+        if len(intervalos) == 0:
+            registro.warning("Advertencia: No se detectaron intervalos de audio que superen el umbral de silencio.")
+            intervalos = np.array([[0, n]])
+        maximo = max(picos[comienzo // hop_length:-(-fin // hop_length)].max() for comienzo, fin in intervalos)
+
+        salida = np.zeros(int(self.target_duration * self.sampling_rate), dtype=np.float32)
+        if senal is not None:
+            llenas = self._copiar_intervalos(senal, 0, intervalos, salida, 0)
+        else:
+            llenas, inicio = 0, 0
+            for filtrado in self._bloques_filtrados(fuente, tamano_bloque):
+                llenas = self._copiar_intervalos(filtrado, inicio, intervalos, salida, llenas)
+                inicio += len(filtrado)
+                if llenas == len(salida) or inicio >= intervalos[-1][1]:
+                    break
+        salida[:llenas] /= maximo
+        return salida
+
+    def _procesar_acotado(self, fuente, nombre):
+        """
+        Ejecuta `_process_audio_acotado` midiendo e informando el pico de memoria residente del archivo.
+        """
+        reiniciar_rss_pico()
+        with metricas.medir("procesador.acotado"):
+            audio = self._process_audio_acotado(fuente)
+        self.rss_pico_archivo_mb = rss_pico_mb()
+        metricas.contar("procesador.archivos_decodificados")
+        if self.rss_pico_archivo_mb is None:
+            return audio
+        registro.info(f"{nombre}: pico de memoria {self.rss_pico_archivo_mb:.1f} MB",
+                      extra={"campos": {"archivo": nombre, "rss_pico_mb": self.rss_pico_archivo_mb}})
+        if self.rss_pico_archivo_mb > self.limite_memoria_mb:
+            registro.warning(f"Advertencia: {nombre} superó el límite de memoria de {self.limite_memoria_mb} MB.")
         return audio
 
-    def procesar_base_datos(self):
-        for file_name in os.listdir(self.crudos_path):
-            if file_name.endswith((".wav", ".mp3")):
-                file_path = os.path.join(self.crudos_path, file_name)
-                processed_audio = self._process_audio(file_path)
+    def _process_audio(self, file_path):
+        if self.limite_memoria_mb is not None:
+            return self._procesar_acotado(self._fuente_archivo(file_path), file_path)
+        with metricas.medir("procesador.decodificacion"):
+            audio, sr = self.decodificador.cargar(file_path, sr=self.sampling_rate)
+        metricas.contar("procesador.archivos_decodificados")
+        metricas.contar("procesador.bytes_decodificados", audio.nbytes)
+        return self._process_signal(audio, sr)
+
+    def procesar_senal(self, audio, sr):
+        """
+        Procesa en memoria una señal ya cargada (sin leer ni escribir archivos).
+        :param audio: Señal de audio (1D).
+        :param sr: Frecuencia de muestreo de la señal; se remuestrea si no coincide con `sampling_rate`.
+        :return: Audio procesado de `target_duration` segundos a `sampling_rate`.
+        """
+        if self.limite_memoria_mb is not None:
+            return self._procesar_acotado(self._fuente_senal(audio, sr), "señal")
+        audio = np.asarray(audio, dtype=np.float32)
+        if sr != self.sampling_rate:
+            audio = self.decodificador.remuestrear(audio, sr, self.sampling_rate)
+        return self._process_signal(audio, self.sampling_rate)
+
+    def _filtrar_lote(self, senales, longitudes, tamano_bloque=8192):
+        """
+        Aplica en el lugar el pasabanda a un lote (N, muestras) con filas ordenadas por longitud decreciente,
+        por bloques temporales con el estado del filtro, incluyendo en cada bloque solo las filas que siguen
+        vigentes. Filtrar el relleno completo es mucho más lento: la respuesta del filtro sobre los ceros decae
+        hasta números subnormales. El resultado es idéntico al de filtrar cada señal por separado.
+        """
+        sos = self._sos_pasabanda(self.sampling_rate)
+        zi = np.zeros((sos.shape[0], len(senales), 2))
+        for inicio in range(0, senales.shape[1], tamano_bloque):
+            vivas = int(np.count_nonzero(longitudes > inicio))
+            bloque = senales[:vivas, inicio:inicio + tamano_bloque]
+            senales[:vivas, inicio:inicio + tamano_bloque], zi[:, :vivas] = sosfilt(sos, bloque, axis=-1, zi=zi[:, :vivas])
+
+    def procesar_lote(self, audios, threshold_db=-25, frame_length=2048, hop_length=512):
+        """
+        Preprocesa un lote de señales con unas pocas operaciones vectorizadas sobre una matriz rellenada con ceros,
+        con el mismo resultado que aplicar `_process_signal` a cada una:
+        filtro SOS cacheado a lo largo del eje temporal, RMS por frame (mismos frames que `librosa.effects.split`),
+        máscara de muestras no silenciosas, normalización por el pico de esas muestras y ajuste a `target_duration`.
+        :param audios: Lista de señales 1D a `sampling_rate`, de cualquier longitud (no vacías).
+        :param threshold_db: Umbral de silencio, con el mismo significado que en `_remove_silence`.
+        :return: Matriz (N, target_duration * sampling_rate) con un audio procesado por fila.
+        """
+        with metricas.medir("procesador.lote"):
+            # Filas ordenadas por longitud decreciente, para filtrar solo las señales que siguen vigentes
+            longitudes = np.array([len(audio) for audio in audios])
+            orden = np.argsort(-longitudes, kind="stable")
+            longitudes = longitudes[orden]
+            n_hops = -(-longitudes[0] // hop_length)
+            senales = np.zeros((len(audios), n_hops * hop_length))
+            for i, j in enumerate(orden):
+                senales[i, :longitudes[i]] = audios[j]
+            self._filtrar_lote(senales, longitudes)
+            for i, longitud in enumerate(longitudes):
+                senales[i, longitud:] = 0.0  # la cola del filtro más allá de cada señal no forma parte de ella
 
-                output_path = os.path.join(self.processed_path, file_name.replace(".mp3", ".wav"))
-                sf.write(output_path, processed_audio, self.sampling_rate)
-                print(f"Audio procesado y guardado: {output_path}")
+            # Energía media de cada frame centrado de `frame_length` muestras cada `hop_length` (relleno con ceros)
+            bloques_por_frame = frame_length // hop_length
+            por_hop = senales.reshape(len(audios), n_hops, hop_length)
+            energia = np.einsum("nbh,nbh->nb", por_hop, por_hop)
+            energia = np.pad(energia, ((0, 0), (bloques_por_frame // 2, bloques_por_frame)))
+            n_frames = n_hops + 1
+            mse = sum(energia[:, k:k + n_frames] for k in range(bloques_por_frame)) / frame_length
+            mse[np.arange(n_frames) >= 1 + longitudes[:, None] // hop_length] = 0.0
+            referencia = np.maximum(1e-10, mse.max(axis=1, keepdims=True))
+            no_silencio = 10.0 * np.log10(np.maximum(1e-10, mse)) - 10.0 * np.log10(referencia) > -threshold_db
 
-                # Realizar augmentación
-                augmented_audios = self._augment_audio(processed_audio, self.sampling_rate)
+            sin_intervalos = ~no_silencio.any(axis=1)
+            for _ in range(int(sin_intervalos.sum())):
+                registro.warning("Advertencia: No se detectaron intervalos de audio que superen el umbral de silencio.")
+
+            # Muestras conservadas de cada bloque de `hop_length`: el bloque entero si su frame no es silencio
+            # (o todos si no hubo intervalos, como en `_remove_silence`), recortado al final de la señal
+            conservadas = np.clip(longitudes[:, None] - np.arange(n_hops) * hop_length, 0, hop_length)
+            conservadas[~(no_silencio[:, :n_hops] | sin_intervalos[:, None])] = 0
+            picos = np.maximum(por_hop.max(axis=2), -por_hop.min(axis=2))
+            maximo = np.where(conservadas > 0, picos, 0.0).max(axis=1)
+
+            # Compactación, normalización y ajuste de duración: solo se copian los bloques que caen en la salida
+            # (únicamente el último bloque de cada señal puede estar incompleto, así que basta con recortar al final)
+            salida = np.zeros((len(audios), int(self.target_duration * self.sampling_rate)))
+            destinos = np.cumsum(conservadas, axis=1) - conservadas
+            copiar = (conservadas > 0) & (destinos < salida.shape[1])
+            totales = np.minimum(conservadas.sum(axis=1), salida.shape[1])
+            for i, j in enumerate(orden):
+                contenido = por_hop[i, copiar[i]].reshape(-1)[:totales[i]]
+                np.divide(contenido, maximo[i], out=salida[j, :totales[i]])
+        metricas.contar("procesador.audios_procesados_en_lote", len(audios))
+        return salida
+
+    def _procesar_archivo(self, file_name):
+        """
+        Procesa y aumenta un archivo de `Crudos` sin escribir nada a disco.
+        Se ejecuta tanto en serie como dentro de los procesos del pool.
+        :return: Tupla (file_name, audio procesado, lista de audios aumentados).
+        """
+        file_path = os.path.join(self.crudos_path, file_name)
+        processed_audio = self._process_audio(file_path)
+        rng = np.random.default_rng(self._semilla_archivo(file_name))
+        augmented_audios = self._augment_audio(processed_audio, self.sampling_rate, rng=rng)
+        return file_name, processed_audio, augmented_audios
+
+    @staticmethod
+    def nombre_archivo(file_name, aug_id=0):
+        """
+        Nombre con el que se guarda un audio procesado (aug_id 0) o su augmentación número `aug_id`.
+        """
+        if aug_id == 0:
+            return file_name.replace(".mp3", ".wav")
+        return file_name.replace(".mp3", "").replace(".wav", f"_aug_{aug_id}.wav")
+
+    def _guardar_resultado(self, file_name, processed_audio, augmented_audios):
+        """
+        Escribe el audio procesado y sus aumentaciones (único escritor, en el proceso principal).
+        """
+        output_path = os.path.join(self.processed_path, self.nombre_archivo(file_name))
+        sf.write(output_path, processed_audio, self.sampling_rate)
+        registro.debug(f"Audio procesado y guardado: {output_path}", extra={"campos": {"archivo": output_path}})
+
+        for i, augmented_audio in enumerate(augmented_audios):
+            aug_output_path = os.path.join(self.augmented_path, self.nombre_archivo(file_name, i + 1))
+            sf.write(aug_output_path, augmented_audio, self.sampling_rate)
+            registro.debug(f"Audio aumentado guardado: {aug_output_path}", extra={"campos": {"archivo": aug_output_path}})
+
+    def generar_aumentaciones(self, workers=1, exportar_wav=False):
+        """
+        Procesa y aumenta todos los audios de `Crudos` y los entrega a medida que se generan,
+        sin escribirlos a disco.
+        :param workers: Número de procesos a usar (mismo resultado que en serie).
+        :param exportar_wav: Si True, además se escriben los WAV en `Processed` y `Augmented` (para escucharlos).
+        :return: Generador de tuplas (archivo fuente, aug_id, audio); aug_id 0 es el audio procesado
+                 y 1..n sus augmentaciones.
+        """
+        archivos = sorted(file_name for file_name in os.listdir(self.crudos_path)
+                          if file_name.endswith((".wav", ".mp3")))
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            resultados = executor.map(self._procesar_archivo, archivos) if executor else map(self._procesar_archivo, archivos)
+            for file_name, processed_audio, augmented_audios in resultados:
+                metricas.contar("procesador.archivos_procesados")
+                metricas.contar("procesador.audios_aumentados", len(augmented_audios))
+                if exportar_wav:
+                    self._guardar_resultado(file_name, processed_audio, augmented_audios)
+                yield file_name, 0, processed_audio
                 for i, augmented_audio in enumerate(augmented_audios):
-                    aug_file_name = file_name.replace(".mp3", "").replace(".wav", f"_aug_{i + 1}.wav")
-                    aug_output_path = os.path.join(self.augmented_path, aug_file_name)
-                    sf.write(aug_output_path, augmented_audio, self.sampling_rate)
-                    print(f"Audio aumentado guardado: {aug_output_path}")
+                    yield file_name, i + 1, augmented_audio
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def procesar_base_datos(self, workers=1):
+        """
+        Procesa y aumenta todos los audios de `Crudos` y los guarda en `Processed` y `Augmented`.
+        :param workers: Número de procesos a usar. Con workers > 1 los archivos se reparten en un
+                        pool de procesos; el resultado es idéntico al de la ejecución en serie.
+        """
+        for _ in self.generar_aumentaciones(workers, exportar_wav=True):
+            pass
 
     def procesar_audio_candidato(self, audio_candidato_path):
         """
@@ -109,8 +476,12 @@ class ProcesadorAudios:
 
         # Procesar el audio
         processed_audio = self._process_audio(audio_candidato_path)
+        self.guardar_candidato(processed_audio)
 
-        # Guardar el audio procesado en la carpeta `Candidato`
+    def guardar_candidato(self, processed_audio):
+        """
+        Guarda un audio candidato ya procesado como `candidato_procesado.wav` en la carpeta `Candidato`.
+        """
         output_path = os.path.join(self.candidato_path, "candidato_procesado.wav")
         sf.write(output_path, processed_audio, self.sampling_rate)  # Guardar como archivo WAV
-        print(f"Audio candidato procesado y guardado en: {output_path}")
\ No newline at end of file
+        registro.info(f"Audio candidato procesado y guardado en: {output_path}")
\ No newline at end of file
@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+def seleccionar_por_correlacion(X, umbral):
+    """
+    Exclusión de parámetros redundantes: se descarta la columna j si su correlación absoluta con alguna
+    columna anterior supera el umbral (triángulo superior de la matriz de correlación).
+    :return: Índices de las columnas conservadas.
+    """
+    if umbral is None:
+        return np.arange(X.shape[1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlacion = np.abs(np.corrcoef(np.asarray(X, dtype=np.float64), rowvar=False))
+    redundantes = (np.triu(correlacion, k=1) > umbral).any(axis=0)
+    return np.flatnonzero(~redundantes)
+
+
+class SelectorParametros:
+    ESTRATEGIAS = ("correlacion", "anova", "random_forest")
+
+    def __init__(self, estrategia="correlacion", correlation_threshold=0.95, k=10, semilla=42):
+        """
+        Etapa de selección de parámetros: se ajusta una vez sobre la base de datos y se aplica igual
+        a la base y a los candidatos.
+        :param estrategia: 'correlacion' (exclusión de redundantes), 'anova' (SelectKBest con F-value)
+                           o 'random_forest' (los k parámetros con mayor importancia).
+        :param correlation_threshold: Umbral de correlación de la estrategia 'correlacion'.
+        :param k: Número de parámetros de las estrategias 'anova' y 'random_forest'.
+        :param semilla: Semilla del Random Forest.
+        """
+        if estrategia not in self.ESTRATEGIAS:
+            raise ValueError(f"Estrategia de selección desconocida: {estrategia}. Opciones: {self.ESTRATEGIAS}")
+        self.estrategia = estrategia
+        self.correlation_threshold = correlation_threshold
+        self.k = k
+        self.semilla = semilla
+        self.columnas = None
+        self.columnas_seleccionadas = None
+        self.indices = None
+
+    @property
+    def firma(self):
+        """
+        Identificador de la configuración del selector (la selección guardada solo se reutiliza con la misma).
+        """
+        if self.estrategia == "correlacion":
+            parametros = {"estrategia": self.estrategia, "correlation_threshold": self.correlation_threshold}
+        else:
+            parametros = {"estrategia": self.estrategia, "k": self.k, "semilla": self.semilla}
+        return hashlib.sha1(json.dumps(parametros, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def ajustar(self, X, y, columnas):
+        """
+        Elige las columnas a conservar.
+        :param X: Matriz (N, d) de características.
+        :param y: Etiquetas de cada fila (no se usan con 'correlacion').
+        :param columnas: Nombres de las d columnas.
+        """
+        if self.estrategia == "correlacion":
+            indices = seleccionar_por_correlacion(X, self.correlation_threshold)
+        elif self.estrategia == "anova":
+            from sklearn.feature_selection import SelectKBest, f_classif
+
+            selector = SelectKBest(score_func=f_classif, k=min(self.k, X.shape[1])).fit(X, y)
+            indices = np.flatnonzero(selector.get_support())
+        else:
+            from sklearn.ensemble import RandomForestClassifier
+
+            modelo = RandomForestClassifier(random_state=self.semilla).fit(X, y)
+            mejores = np.argsort(-modelo.feature_importances_, kind="stable")[:self.k]
+            indices = np.sort(mejores)
+
+        self._fijar(list(columnas), [columnas[i] for i in indices])
+        return self
+
+    def _fijar(self, columnas, columnas_seleccionadas):
+        self.columnas = columnas
+        self.columnas_seleccionadas = columnas_seleccionadas
+        self.indices = [columnas.index(col) for col in columnas_seleccionadas]
+
+    def ajustar_almacen(self, almacen, cache_path=None):
+        """
+        Ajusta el selector sobre un `AlmacenCaracteristicas`, reutilizando la selección guardada en
+        `cache_path` si corresponde al mismo hash del almacén y a la misma configuración.
+        """
+        cache = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as archivo:
+                cache = json.load(archivo)
+
+        entrada = cache.get(self.firma)
+        if entrada is not None and entrada["hash_almacen"] == almacen.hash and entrada["columnas"] == almacen.columnas:
+            self._fijar(almacen.columnas, entrada["columnas_seleccionadas"])
+            return self
+
+        self.ajustar(almacen.X, almacen.etiquetas, almacen.columnas)
+        if cache_path is not None:
+            cache[self.firma] = {
+                "hash_almacen": almacen.hash,
+                "columnas": self.columnas,
+                "columnas_seleccionadas": self.columnas_seleccionadas,
+            }
+            with open(cache_path, "w", encoding="utf-8") as archivo:
+                json.dump(cache, archivo, ensure_ascii=False, indent=2)
+        return self
+
+    def transformar(self, X, columnas=None):
+        """
+        Aplica la selección ajustada.
+        :param columnas: Nombres de las columnas de X, si no están en el mismo orden que al ajustar.
+        """
+        if columnas is None:
+            return np.asarray(X)[:, self.indices]
+        return np.asarray(X)[:, [list(columnas).index(col) for col in self.columnas_seleccionadas]]
@@ -0,0 +1,255 @@
+import os
+import copy
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ClasificadorAudios import ClasificadorAudios
+from Instrumentacion import metricas
+
+
+class ServicioClasificacion:
+    def __init__(self, host="127.0.0.1", puerto=8765, ventana_ms=5.0, tamano_lote_max=64):
+        """
+        Servicio local de clasificación que mantiene cargado el modelo (preprocesamiento, características,
+        escalador, PCA e índice de vecinos) y agrupa las solicitudes que llegan dentro de una ventana corta
+        en una única consulta vectorizada al k-NN.
+        :param host: Dirección en la que escucha el servidor HTTP (por defecto solo local).
+        :param puerto: Puerto del servidor HTTP.
+        :param ventana_ms: Tiempo máximo que se espera para juntar solicitudes en un mismo lote.
+        :param tamano_lote_max: Cantidad máxima de solicitudes por lote.
+        """
+        self.host = host
+        self.puerto = puerto
+        self.ventana = ventana_ms / 1000.0
+        self.tamano_lote_max = tamano_lote_max
+        self.clasificador = ClasificadorAudios(sin_graficos=True)
+        self.cola = queue.Queue()
+        self.servidor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Un `ProcesadorAudios` por hilo HTTP (sus buffers no se comparten)
+        self._firma_almacen = None  # mtime del almacén con el que se cargó el modelo
+        self.metricas = {
+            "solicitudes": 0,
+            "errores": 0,
+            "lotes": 0,
+            "candidatos_en_lotes": 0,
+            "latencia_total_s": 0.0,
+            "latencia_max_s": 0.0,
+            "inicio": time.time(),
+        }
+
+    def precalentar(self):
+        """
+        Carga el modelo y el escalador y compila el camino de clasificación para que la primera
+        solicitud no pague ese costo (ver `ClasificadorAudios.precalentar`).
+        """
+        return self.clasificador.precalentar()
+
+    def _procesador(self):
+        """
+        Copia del `ProcesadorAudios` propia del hilo que atiende la solicitud: los buffers de trabajo del
+        modo de memoria acotada no son seguros entre hilos (la copia arranca sin buffers, ver `__getstate__`).
+        """
+        procesador = getattr(self._local, "procesador", None)
+        if procesador is None:
+            procesador = self._local.procesador = copy.copy(self.clasificador.procesador)
+        return procesador
+
+    def _modelo_actualizado(self):
+        """
+        Carga el modelo solo si el almacén de la base de datos cambió desde la última carga (por su mtime),
+        en lugar de verificar el hash del almacén completo en cada lote.
+        """
+        almacen = self.clasificador.knn.base_datos_almacen
+
+        def firma():
+            try:
+                return os.stat(almacen.ruta_matriz).st_mtime_ns, os.stat(almacen.ruta_metadatos).st_mtime_ns
+            except FileNotFoundError:
+                return None
+
+        actual = firma()
+        if actual is None or actual != self._firma_almacen or self.clasificador.knn.modelo is None:
+            self.clasificador.knn.cargar_modelo()
+            self._firma_almacen = firma()  # la carga puede haber migrado o reescrito el almacén
+
+    def _preparar(self, solicitud):
+        """
+        Convierte una solicitud JSON en el vector de características escaladas del audio.
+        Acepta {"ruta": "..."} o {"audio": [...], "sr": 16000}.
+        """
+        procesador = self._procesador()
+        if "ruta" in solicitud:
+            if not os.path.isfile(solicitud["ruta"]):
+                raise FileNotFoundError(f"El archivo {solicitud['ruta']} no existe o no es accesible.")
+            processed_audio = procesador._process_audio(solicitud["ruta"])
+        elif "audio" in solicitud and "sr" in solicitud:
+            processed_audio = procesador.procesar_senal(np.asarray(solicitud["audio"], dtype=np.float32), solicitud["sr"])
+        else:
+            raise ValueError('La solicitud debe incluir "ruta" o "audio" y "sr".')
+        return self.clasificador.parametrizador.parametrizar_audios(processed_audio[np.newaxis, :],
+                                                                    procesador.sampling_rate)[0]
+
+    def clasificar(self, solicitud):
+        """
+        Prepara la solicitud en el hilo que la atiende y la encola para el próximo lote.
+        :return: Diccionario con la etiqueta, la proporción de votos por clase y las distancias a los vecinos.
+        """
+        inicio = time.perf_counter()
+        futuro = Future()
+        self.cola.put((self._preparar(solicitud), futuro))
+        resultado = futuro.result()
+
+        latencia = time.perf_counter() - inicio
+        with self._lock:
+            self.metricas["solicitudes"] += 1
+            self.metricas["latencia_total_s"] += latencia
+            self.metricas["latencia_max_s"] = max(self.metricas["latencia_max_s"], latencia)
+        return resultado
+
+    def _bucle_lotes(self):
+        """
+        Junta las solicitudes encoladas durante `ventana` segundos (o hasta `tamano_lote_max`)
+        y las clasifica con una sola llamada a `Knn.clasificar_lote`.
+        """
+        while True:
+            pendientes = [self.cola.get()]
+            limite = time.perf_counter() + self.ventana
+            while len(pendientes) < self.tamano_lote_max:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(self.cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            try:
+                self._modelo_actualizado()
+                resultado = self.clasificador.knn.clasificar_lote(np.stack([fila for fila, _ in pendientes]),
+                                                                  en_memoria=True)
+            except Exception as e:
+                for _, futuro in pendientes:
+                    futuro.set_exception(e)
+                continue
+
+            clases = [str(clase) for clase in resultado["clases"]]
+            for i, (_, futuro) in enumerate(pendientes):
+                futuro.set_result({
+                    "etiqueta": str(resultado["predicciones"][i]),
+                    "votos": dict(zip(clases, resultado["votos"][i].tolist())),
+                    "distancias": resultado["distancias"][i].tolist(),
+                })
+            with self._lock:
+                self.metricas["lotes"] += 1
+                self.metricas["candidatos_en_lotes"] += len(pendientes)
+
+    def obtener_metricas(self):
+        with self._lock:
+            metricas = dict(self.metricas)
+        metricas["tiempo_activo_s"] = time.time() - metricas.pop("inicio")
+        metricas["latencia_media_s"] = metricas["latencia_total_s"] / max(metricas["solicitudes"], 1)
+        metricas["tamano_lote_medio"] = metricas["candidatos_en_lotes"] / max(metricas["lotes"], 1)
+        return metricas
+
+    def exportar_prometheus(self):
+        """
+        Métricas del servicio y de las etapas del flujo en el formato de texto de Prometheus.
+        """
+        lineas = []
+        for nombre, valor in self.obtener_metricas().items():
+            lineas += [f"# TYPE clasificador_servicio_{nombre} gauge", f"clasificador_servicio_{nombre} {valor}"]
+        return "\n".join(lineas) + "\n" + metricas.exportar_prometheus()
+
+    def iniciar(self):
+        """
+        Precalienta el modelo, lanza el hilo de lotes y atiende solicitudes HTTP hasta que se interrumpa.
+        """
+        self.precalentar()
+        metricas.habilitada = True
+        threading.Thread(target=self._bucle_lotes, daemon=True).start()
+        self.servidor = ThreadingHTTPServer((self.host, self.puerto), _ManejadorHTTP)
+        self.servidor.servicio = self
+        print(f"Servicio de clasificación escuchando en http://{self.host}:{self.puerto}")
+        try:
+            self.servidor.serve_forever()
+        finally:
+            self.servidor.server_close()
+
+    def detener(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+
+
+class _ManejadorHTTP(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+    - POST /clasificar: cuerpo JSON {"ruta": ...} o {"audio": [...], "sr": ...}.
+    - GET /salud: estado del servicio y hash de la base de datos del modelo cargado.
+    - GET /metricas: contadores y latencias del servicio.
+    - GET /metrics: las mismas métricas y las de cada etapa del flujo, en formato de texto de Prometheus.
+    """
+
+    def _responder(self, codigo, contenido):
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        servicio = self.server.servicio
+        if self.path == "/salud":
+            modelo = servicio.clasificador.knn.modelo
+            self._responder(200, {"estado": "ok", "hash_almacen": None if modelo is None else modelo["hash_almacen"]})
+        elif self.path == "/metricas":
+            self._responder(200, servicio.obtener_metricas())
+        elif self.path == "/metrics":
+            cuerpo = servicio.exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+        else:
+            self._responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        servicio = self.server.servicio
+        if self.path != "/clasificar":
+            self._responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+            return
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            solicitud = json.loads(self.rfile.read(longitud) or b"{}")
+            self._responder(200, servicio.clasificar(solicitud))
+        except (ValueError, FileNotFoundError) as e:
+            with servicio._lock:
+                servicio.metricas["errores"] += 1
+            self._responder(400, {"error": str(e)})
+        except Exception as e:
+            with servicio._lock:
+                servicio.metricas["errores"] += 1
+            self._responder(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        # Evitar una línea de log por solicitud
+        pass
+
+
+# Punto de entrada para el servicio
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de clasificación de audios.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--ventana-ms", type=float, default=5.0)
+    parser.add_argument("--lote-max", type=int, default=64)
+    args = parser.parse_args()
+
+    ServicioClasificacion(args.host, args.puerto, args.ventana_ms, args.lote_max).iniciar()
@@ -1,33 +1,160 @@
-from pydub import AudioSegment
 import os
+import sys
+import json
+import argparse
+import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from CacheCaracteristicas import CacheCaracteristicas
+from DecodificadorAudios import DecodificadorAudios
+from Instrumentacion import registro
+
+EXTENSIONES = (".ogg", ".mp3", ".m4a")
+SUBTIPOS = {"pcm16": "PCM_16", "float": "FLOAT"}
+REGISTRO_CONVERSIONES = ".convertidos.json"
+
+
+def _leer_registro(output_folder):
+    """
+    Registro de conversiones anteriores: por archivo de salida, la fuente, su hash, mtime y tamaño,
+    y los parámetros de la conversión.
+    """
+    ruta = os.path.join(output_folder, REGISTRO_CONVERSIONES)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def _guardar_registro(output_folder, conversiones):
+    ruta = os.path.join(output_folder, REGISTRO_CONVERSIONES)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+        json.dump(conversiones, archivo, ensure_ascii=False, indent=2)
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def _convertido(anterior, input_path, output_path, parametros):
+    """
+    Indica si `output_path` ya es la conversión vigente de `input_path`: primero se compara mtime y tamaño
+    de la fuente y, si cambiaron (p.ej. se copió de nuevo), su hash.
+    :return: Tupla (ya convertido, hash de la fuente o None si no hizo falta calcularlo).
+    """
+    if anterior is None or not os.path.exists(output_path) or anterior["parametros"] != parametros:
+        return False, None
+    estado = os.stat(input_path)
+    if anterior["mtime"] == estado.st_mtime and anterior["tamano"] == estado.st_size:
+        return True, anterior["hash"]
+    hash_fuente = CacheCaracteristicas.hash_archivo(input_path)
+    return hash_fuente == anterior["hash"], hash_fuente
+
+
+def _convertir_archivo(decodificador, input_path, output_path, sr, subtipo):
+    """
+    Decodifica, pasa a mono, remuestrea a `sr` y escribe el WAV de forma atómica
+    (primero a un temporal), de modo que una conversión interrumpida no deje un archivo a medias.
+    """
+    audio, _ = decodificador.cargar(input_path, sr=sr)
+    ruta_temporal = f"{output_path}.tmp"
+    sf.write(ruta_temporal, audio, sr, subtype=subtipo, format="WAV")
+    os.replace(ruta_temporal, output_path)
+
+
+def convertir_audios(input_folder, output_folder=None, sr=16000, formato="pcm16", workers=None, forzar=False):
+    """
+    Convierte en paralelo los audios .ogg, .mp3 y .m4a de una carpeta a WAV mono a `sr`, listos para
+    `ProcesadorAudios` (sin volver a remuestrear). Se omiten los archivos ya convertidos con los mismos
+    parámetros y cuya fuente no cambió; un archivo que falla se informa sin detener el resto, igual que las
+    fuentes que comparten nombre (p.ej. a.ogg y a.mp3), que no se convierten para no pisarse.
+    :param input_folder: Carpeta con las grabaciones a convertir.
+    :param output_folder: Carpeta de salida (por defecto `DB/Crudos`).
+    :param sr: Frecuencia de muestreo de salida.
+    :param formato: 'pcm16' (enteros de 16 bits) o 'float' (float32).
+    :param workers: Máximo de conversiones simultáneas (por defecto, el número de CPUs).
+    :param forzar: Si True, se convierten de nuevo todos los archivos.
+    :return: Diccionario con las listas "convertidos" y "omitidos" y el diccionario "errores" (archivo -> mensaje).
+    """
+    if formato not in SUBTIPOS:
+        raise ValueError(f"Formato no soportado: {formato} (se admiten 'pcm16' y 'float').")
+    if output_folder is None:
+        output_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DB", "Crudos")
+    os.makedirs(output_folder, exist_ok=True)
+
+    parametros = {"sr": sr, "formato": formato}
+    conversiones = {} if forzar else _leer_registro(output_folder)
+    decodificador = DecodificadorAudios()
+    resultado = {"convertidos": [], "omitidos": [], "errores": {}}
+
+    def convertir(file_name):
+        input_path = os.path.join(input_folder, file_name)
+        output_name = os.path.splitext(file_name)[0] + ".wav"
+        output_path = os.path.join(output_folder, output_name)
+        ya_convertido, hash_fuente = _convertido(conversiones.get(output_name), input_path, output_path, parametros)
+        if not ya_convertido:
+            _convertir_archivo(decodificador, input_path, output_path, sr, SUBTIPOS[formato])
+        # Se registra el mtime vigente aunque no se convierta, para no recalcular el hash la próxima vez
+        estado = os.stat(input_path)
+        return file_name, output_name, hash_fuente or CacheCaracteristicas.hash_archivo(input_path), estado, ya_convertido
+
+    archivos = sorted(file_name for file_name in os.listdir(input_folder) if file_name.lower().endswith(EXTENSIONES))
+
+    # Fuentes con el mismo nombre (p.ej. a.ogg y a.mp3) escribirían el mismo WAV: se informan como error
+    por_salida = {}
+    for file_name in archivos:
+        por_salida.setdefault(os.path.splitext(file_name)[0] + ".wav", []).append(file_name)
+    for output_name, fuentes in por_salida.items():
+        if len(fuentes) > 1:
+            for file_name in fuentes:
+                resultado["errores"][file_name] = (f"ValueError: {', '.join(fuentes)} se convertirían "
+                                                   f"al mismo archivo {output_name}")
+                registro.error(f"Error al convertir {file_name}: {resultado['errores'][file_name]}")
+    archivos = [file_name for file_name in archivos if file_name not in resultado["errores"]]
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futuros = {file_name: executor.submit(convertir, file_name) for file_name in archivos}
+        for file_name, futuro in futuros.items():
+            try:
+                file_name, output_name, hash_fuente, estado, ya_convertido = futuro.result()
+            except Exception as e:
+                resultado["errores"][file_name] = f"{type(e).__name__}: {e}".rstrip(": ")
+                registro.error(f"Error al convertir {file_name}: {resultado['errores'][file_name]}")
+                continue
+            conversiones[output_name] = {"fuente": file_name, "hash": hash_fuente, "mtime": estado.st_mtime,
+                                         "tamano": estado.st_size, "parametros": parametros}
+            if ya_convertido:
+                resultado["omitidos"].append(file_name)
+            else:
+                resultado["convertidos"].append(file_name)
+                registro.debug(f"Convertido: {file_name} -> {output_name}")
+
+    _guardar_registro(output_folder, conversiones)
+    registro.info(f"Conversión terminada en {output_folder}: {len(resultado['convertidos'])} convertidos, "
+                  f"{len(resultado['omitidos'])} ya convertidos, {len(resultado['errores'])} con errores.")
+    return resultado
+
 
 def convertir_ogg_a_wav(input_folder, output_folder):
     """
-    Convierte todos los archivos .ogg en la carpeta de entrada a formato .wav
-    utilizando ffmpeg como backend.
-    
+    Convierte todos los archivos .ogg, .mp3 y .m4a de la carpeta de entrada a WAV de 16 kHz mono
+    (ver `convertir_audios`).
+
     Args:
         input_folder (str): Carpeta donde se encuentran los archivos .ogg.
         output_folder (str): Carpeta donde se guardarán los archivos .wav.
     """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    for file_name in os.listdir(input_folder):
-        if file_name.endswith(".ogg"):
-            input_path = os.path.join(input_folder, file_name)
-            output_path = os.path.join(output_folder, file_name.replace(".ogg", ".wav"))
+    return convertir_audios(input_folder, output_folder)
 
-            try:
-                # Cargar archivo OGG y exportar como WAV
-                audio = AudioSegment.from_file(input_path, format="ogg")
-                audio.export(output_path, format="wav")
-                print(f"Convertido: {file_name} -> {output_path}")
-            except Exception as e:
-                print(f"Error al convertir {file_name}: {e}")
 
-# Carpetas de entrada y salida
-input_folder = r"C:\Users\berni\Desktop\OOG"
-output_folder = r"C:\Users\berni\Desktop\WAV"
+# Punto de entrada para la ingesta de grabaciones nuevas
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte grabaciones .ogg/.mp3/.m4a a WAV mono para DB/Crudos.")
+    parser.add_argument("entrada", help="Carpeta con las grabaciones a convertir.")
+    parser.add_argument("--salida", default=None, help="Carpeta de salida (por defecto DB/Crudos).")
+    parser.add_argument("--sr", type=int, default=16000)
+    parser.add_argument("--formato", choices=sorted(SUBTIPOS), default="pcm16")
+    parser.add_argument("--workers", type=int, default=None, help="Conversiones simultáneas (por defecto, las CPUs).")
+    parser.add_argument("--forzar", action="store_true", help="Convertir de nuevo también los ya convertidos.")
+    args = parser.parse_args()
 
-convertir_ogg_a_wav(input_folder, output_folder)
+    resultado = convertir_audios(args.entrada, args.salida, args.sr, args.formato, args.workers, args.forzar)
+    for file_name, error in resultado["errores"].items():
+        print(f"{file_name}: {error}")
+    sys.exit(1 if resultado["errores"] else 0)
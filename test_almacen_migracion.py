@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from AlmacenCaracteristicas import AlmacenCaracteristicas
+from ClasificadorAudios import ClasificadorAudios
+from Knn import Knn
+from Parametrizador import Parametrizador
+from ProcesadorAudios import ProcesadorAudios
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_BASE_DATOS = os.path.join(BASE_DIR, "Parametros", "base_datos_aumentada_parametros.csv")
+
+
+@pytest.fixture
+def directorio_csv(tmp_path):
+    """
+    Directorio de trabajo con solo los CSV de `Parametros/` que trae el repositorio (sin almacenes binarios).
+    """
+    os.makedirs(tmp_path / "Parametros")
+    for nombre in ("base_datos_aumentada_parametros.csv", "base_datos_parametros.csv", "candidato_parametros.csv"):
+        shutil.copy(os.path.join(BASE_DIR, "Parametros", nombre), tmp_path / "Parametros" / nombre)
+    return str(tmp_path)
+
+
+def test_cargar_migra_el_csv(directorio_csv):
+    almacen = AlmacenCaracteristicas(os.path.join(directorio_csv, "Parametros", "base_datos_aumentada_parametros"))
+    assert not almacen.existe
+    almacen.cargar()
+    df = pd.read_csv(CSV_BASE_DATOS)
+    assert almacen.existe
+    assert almacen.columnas == list(df.drop(columns=["Archivo", "Etiqueta"]).columns)
+    np.testing.assert_array_equal(almacen.etiquetas, df["Etiqueta"].values)
+    np.testing.assert_allclose(almacen.X, df.drop(columns=["Archivo", "Etiqueta"]).values, rtol=1e-6, atol=1e-6)
+
+
+def test_escalador_desde_csv(directorio_csv):
+    # Como el almacén migrado no guarda el escalador, se ajusta sobre sus datos (igual que antes con el CSV)
+    parametrizador = Parametrizador(usar_cache=False, base_path=directorio_csv)
+    parametrizador._cargar_escalador()
+    caracteristicas = pd.read_csv(CSV_BASE_DATOS).drop(columns=["Archivo", "Etiqueta"]).values
+    np.testing.assert_allclose(parametrizador.scaler.mean_, caracteristicas.mean(axis=0), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(parametrizador.scaler.scale_, caracteristicas.std(axis=0), rtol=1e-5, atol=1e-6)
+
+
+def test_clasificar_audio_desde_csv(directorio_csv):
+    clasificador = ClasificadorAudios(sin_graficos=True)
+    clasificador.procesador = ProcesadorAudios(base_path=directorio_csv)
+    clasificador.parametrizador = Parametrizador(usar_cache=False, base_path=directorio_csv)
+    clasificador.knn = Knn(candidato_csv=None, sin_graficos=True, base_path=directorio_csv)
+    etiqueta = clasificador.clasificar_audio(os.path.join(BASE_DIR, "DB", "Crudos", "Camote.wav"))
+    assert etiqueta in set(pd.read_csv(CSV_BASE_DATOS)["Etiqueta"])
+
+
+def test_guardar_no_altera_la_matriz_mapeada(tmp_path):
+    almacen = AlmacenCaracteristicas(str(tmp_path / "almacen"))
+    almacen.guardar(np.ones((4, 3)), ["a", "b", "c"], ["1", "2", "3", "4"])
+    lector = AlmacenCaracteristicas(str(tmp_path / "almacen")).cargar()
+    almacen.guardar(np.zeros((8, 3)), ["a", "b", "c"], [str(i) for i in range(8)])
+    np.testing.assert_array_equal(lector.X, np.ones((4, 3)))
+    assert AlmacenCaracteristicas(str(tmp_path / "almacen")).cargar().X.shape == (8, 3)
+    assert sorted(os.listdir(tmp_path)) == ["almacen.json", "almacen.npy"]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from scipy.signal import butter, lfilter
+
+import ProcesadorAudios as modulo_procesador
+from ProcesadorAudios import ProcesadorAudios
+
+SR = 16000
+
+
+def _senal(rng, n):
+    """
+    Ruido de fondo con algunos tonos de distinta duración y amplitud (intervalos no silenciosos).
+    """
+    t = np.arange(n) / SR
+    audio = 0.01 * rng.standard_normal(n)
+    for _ in range(3):
+        inicio, duracion = rng.uniform(0, n / SR), rng.uniform(0.05, 0.8)
+        tramo = (t >= inicio) & (t < inicio + duracion)
+        audio[tramo] += rng.uniform(0.2, 1.0) * np.sin(2 * np.pi * rng.uniform(300, 2000) * t[tramo])
+    return audio.astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def procesador():
+    return ProcesadorAudios()
+
+
+@pytest.fixture(scope="module")
+def audios():
+    rng = np.random.default_rng(3)
+    # Longitudes variadas: menores que un hop, múltiplos exactos del hop, justo 2 s y más de 2 s
+    longitudes = [300, 511, 512, 1024, 2049, 2 * SR, 3 * SR + 7] + list(rng.integers(3000, 6 * SR, 16))
+    return [_senal(rng, int(n)) for n in longitudes]
+
+
+def _procesar_anterior(procesador, audio, threshold_db):
+    """
+    El preprocesamiento por archivo con el filtro en forma (b, a) que se usaba antes del SOS.
+    """
+    nyquist = 0.5 * SR
+    b, a = butter(5, [300.0 / nyquist, 3400.0 / nyquist], btype="band")
+    audio = procesador._remove_silence(lfilter(b, a, audio), SR, threshold_db=threshold_db)
+    return procesador._adjust_duration(procesador._normalize_audio(audio))
+
+
+def _procesar_por_archivo(procesador, audio, threshold_db):
+    audio = procesador._remove_silence(procesador._butter_bandpass_filter(audio, fs=SR), SR, threshold_db=threshold_db)
+    return procesador._adjust_duration(procesador._normalize_audio(audio))
+
+
+@pytest.mark.parametrize("threshold_db", [-25, 20, 30, 40])
+def test_procesar_lote_igual_al_procesamiento_por_archivo(procesador, audios, threshold_db):
+    lote = procesador.procesar_lote(audios, threshold_db=threshold_db)
+    assert lote.shape == (len(audios), int(procesador.target_duration * SR))
+    for fila, audio in zip(lote, audios):
+        np.testing.assert_array_equal(fila, _procesar_por_archivo(procesador, audio, threshold_db))
+
+
+@pytest.mark.parametrize("threshold_db", [-25, 20, 30, 40])
+def test_procesar_lote_igual_al_filtro_anterior(procesador, audios, threshold_db):
+    lote = procesador.procesar_lote(audios, threshold_db=threshold_db)
+    for fila, audio in zip(lote, audios):
+        np.testing.assert_allclose(fila, _procesar_anterior(procesador, audio, threshold_db), rtol=0, atol=1e-8)
+
+
+def test_process_signal_igual_al_lote(procesador, audios):
+    lote = procesador.procesar_lote(audios)
+    for fila, audio in zip(lote, audios):
+        np.testing.assert_array_equal(fila, procesador._process_signal(audio, SR))
+
+
+def test_procesar_lote_sin_intervalos_conserva_la_senal(procesador, audios, monkeypatch):
+    # Con threshold_db=-25 ningún frame supera el umbral: se conserva la señal filtrada completa y se advierte
+    advertencias = []
+    monkeypatch.setattr(modulo_procesador.registro, "warning", advertencias.append)
+    lote = procesador.procesar_lote(audios, threshold_db=-25)
+    assert len(advertencias) == len(audios)
+    for fila, audio in zip(lote, audios):
+        filtrado = procesador._butter_bandpass_filter(audio, fs=SR)
+        np.testing.assert_array_equal(fila, procesador._adjust_duration(procesador._normalize_audio(filtrado)))
+
+
+def test_procesar_lote_umbral_real_recorta_silencios(procesador, audios):
+    con_silencios = procesador.procesar_lote(audios, threshold_db=-25)
+    sin_silencios = procesador.procesar_lote(audios, threshold_db=20)
+    assert np.abs(con_silencios - sin_silencios).max() > 0.1